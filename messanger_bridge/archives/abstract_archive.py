@@ -0,0 +1,29 @@
+import abc
+import datetime
+import typing
+
+from models.message import Message
+from settings import ArchiveSettings
+
+
+class AbstractArchive(abc.ABC):
+
+    def __init__(self, settings: ArchiveSettings) -> None:
+        self.settings = settings
+
+    @abc.abstractmethod
+    def append(self, message: Message) -> None:
+        pass
+
+    @abc.abstractmethod
+    def read(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        chat_id: str | None = None,
+    ) -> typing.Generator[Message, None, None]:
+        pass
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        pass
@@ -0,0 +1,172 @@
+import contextlib
+import datetime
+import gzip
+import io
+import json
+import logging
+import pathlib
+import queue
+import threading
+import time
+import typing
+
+import pydantic
+
+from archives.abstract_archive import AbstractArchive
+from models.message import Message
+from settings import ArchiveSettings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentIndex(pydantic.BaseModel):
+    name: str
+    min_timestamp: float
+    max_timestamp: float
+    chat_ids: set[str] = set()
+    size: int = 0
+
+
+def compress(data: bytes) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data)
+
+    return gzip.compress(data)
+
+
+def open_segment(path: pathlib.Path) -> typing.IO[bytes]:
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            path.open("rb"), read_across_frames=True
+        )
+        return io.BufferedReader(reader)
+
+    return gzip.open(path, "rb")
+
+
+class SegmentArchive(AbstractArchive):
+
+    def __init__(self, settings: ArchiveSettings) -> None:
+        super().__init__(settings)
+        self.path = pathlib.Path(self.settings.dsn)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.queue: queue.Queue[Message | None] = queue.Queue()
+        self.segment: SegmentIndex | None = None
+        self.segment_started_at = 0.0
+        self.writer: threading.Thread | None = None
+        self.writer_lock = threading.Lock()
+
+    def append(self, message: Message) -> None:
+        if self.writer is None:
+            with self.writer_lock:
+                if self.writer is None:
+                    self.writer = threading.Thread(
+                        target=self.write_batches, name="archive", daemon=True
+                    )
+                    self.writer.start()
+
+        self.queue.put_nowait(message)
+
+    def close(self) -> None:
+        if self.writer is not None and self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+
+    def write_batches(self) -> None:
+        closed = False
+        while not closed:
+            batch = []
+            deadline = time.monotonic() + self.settings.flush_interval
+            while len(batch) < self.settings.batch_size:
+                try:
+                    message = self.queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+
+                if message is None:
+                    closed = True
+                    break
+
+                batch.append(message)
+
+            if batch:
+                try:
+                    self.write(batch)
+                except Exception:
+                    logger.exception("Failed to archive %s messages", len(batch))
+
+    def write(self, batch: list[Message]) -> None:
+        timestamps = [message.timestamp.timestamp() for message in batch]
+        if (
+            self.segment is None
+            or self.segment.size >= self.settings.segment_size
+            or time.monotonic() - self.segment_started_at >= self.settings.segment_age
+        ):
+            suffix = ".zst" if zstandard is not None else ".gz"
+            self.segment = SegmentIndex(
+                name=f"{int(time.time() * 1000)}.jsonl{suffix}",
+                min_timestamp=min(timestamps),
+                max_timestamp=max(timestamps),
+            )
+            self.segment_started_at = time.monotonic()
+
+        data = compress(
+            "".join(message.model_dump_json() + "\n" for message in batch).encode()
+        )
+        with (self.path / self.segment.name).open("ab") as f:
+            f.write(data)
+
+        self.segment.size += len(data)
+        self.segment.min_timestamp = min(self.segment.min_timestamp, *timestamps)
+        self.segment.max_timestamp = max(self.segment.max_timestamp, *timestamps)
+        self.segment.chat_ids.update(message.chat_id for message in batch)
+        index_path = self.path / f"{self.segment.name}.idx"
+        index_path.write_text(self.segment.model_dump_json())
+
+    def segments(self) -> list[SegmentIndex]:
+        segments = []
+        for index_path in sorted(self.path.glob("*.idx")):
+            with contextlib.suppress(OSError, pydantic.ValidationError):
+                segments.append(
+                    SegmentIndex.model_validate_json(index_path.read_text())
+                )
+
+        return segments
+
+    def read(
+        self,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        chat_id: str | None = None,
+    ) -> typing.Generator[Message, None, None]:
+        start_timestamp = start.timestamp()
+        end_timestamp = end.timestamp()
+        for segment in self.segments():
+            if (
+                segment.max_timestamp < start_timestamp
+                or segment.min_timestamp > end_timestamp
+                or (chat_id is not None and chat_id not in segment.chat_ids)
+            ):
+                continue
+
+            with open_segment(self.path / segment.name) as f:
+                for line in f:
+                    message = Message.model_validate_json(line)
+                    if chat_id is not None and message.chat_id != chat_id:
+                        continue
+                    if (
+                        start_timestamp
+                        <= message.timestamp.timestamp()
+                        <= end_timestamp
+                    ):
+                        yield message
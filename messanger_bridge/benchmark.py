@@ -0,0 +1,477 @@
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import pathlib
+import random
+import statistics
+import sys
+import time
+import typing
+from io import BytesIO
+
+import aiohttp
+from aiohttp import web
+from PIL import Image
+
+from messangers.discord_messanger import (
+    convert_tgs_to_gif,
+    create_client,
+    download_file,
+    resize_sticker,
+)
+from messangers.splitter import TELEGRAM_TEXT_LIMIT, split_text
+from messangers.telegram_messanger import (
+    adjust_aspect_ratio,
+    pad_image,
+    prepare_sticker,
+)
+from metrics import peak_rss_kib, reset_peak_rss, rss_kib
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger("benchmark")
+
+SEED = 42
+THRESHOLD = float(os.environ.get("BENCHMARK_THRESHOLD", 0.25))
+NOISE_FLOOR = {"seconds": 0.005, "peak_rss_kib": 2048.0, "output_bytes": 0.0}
+BASELINE = pathlib.Path(
+    pathlib.Path(__file__).resolve().parent.parent,
+    "tests",
+    "benchmarks",
+    "baseline.json",
+)
+
+
+def output_size(result: typing.Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, BytesIO):
+        return result.getbuffer().nbytes
+    if isinstance(result, Image.Image):
+        return len(result.tobytes())
+    return len(result)
+
+
+def lottie_sticker(frames: int, shapes: int) -> bytes:
+    rng = random.Random(SEED)
+    layers = []
+    for index in range(shapes):
+        x, y = rng.randint(32, 480), rng.randint(32, 480)
+        layers.append(
+            {
+                "ty": 4,
+                "ind": index,
+                "ip": 0,
+                "op": frames,
+                "st": 0,
+                "ks": {
+                    "o": {"a": 0, "k": 100},
+                    "r": {
+                        "a": 1,
+                        "k": [
+                            {"t": 0, "s": [0], "e": [360]},
+                            {"t": frames},
+                        ],
+                    },
+                    "p": {"a": 0, "k": [x, y, 0]},
+                    "a": {"a": 0, "k": [0, 0, 0]},
+                    "s": {"a": 0, "k": [100, 100, 100]},
+                },
+                "shapes": [
+                    {
+                        "ty": "rc",
+                        "p": {"a": 0, "k": [0, 0]},
+                        "s": {"a": 0, "k": [64, 48]},
+                        "r": {"a": 0, "k": 8},
+                    },
+                    {
+                        "ty": "fl",
+                        "c": {"a": 0, "k": [rng.random(), rng.random(), 0.5, 1]},
+                        "o": {"a": 0, "k": 100},
+                    },
+                ],
+            }
+        )
+    animation = {
+        "v": "5.5.2",
+        "fr": 60,
+        "ip": 0,
+        "op": frames,
+        "w": 512,
+        "h": 512,
+        "tgs": 1,
+        "layers": layers,
+    }
+    return gzip.compress(json.dumps(animation).encode())
+
+
+def noise_image(width: int, height: int, mode: str = "RGBA") -> Image.Image:
+    rng = random.Random(SEED)
+    tile = Image.frombytes(mode, (64, 64), rng.randbytes(64 * 64 * len(mode)))
+    return tile.resize((width, height))
+
+
+def encoded_image(width: int, height: int, format: str) -> bytes:
+    image = noise_image(width, height, "RGBA" if format == "PNG" else "RGB")
+    buffer = BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def build_corpus() -> dict[str, bytes]:
+    logger.info("Build corpus")
+    return {
+        "tgs_short": lottie_sticker(frames=60, shapes=4),
+        "tgs_long": lottie_sticker(frames=180, shapes=16),
+        "sticker_png": encoded_image(512, 512, "PNG"),
+        "sticker_webp": encoded_image(512, 512, "WEBP"),
+        "photo_wide": encoded_image(8000, 200, "JPEG"),
+        "photo_tall": encoded_image(200, 8000, "JPEG"),
+        "photo_huge": encoded_image(6000, 6000, "JPEG"),
+        "file_1m": random.Random(SEED).randbytes(1024 * 1024),
+        "file_7m": random.Random(SEED).randbytes(7 * 1024 * 1024),
+        "file_9m": random.Random(SEED).randbytes(9 * 1024 * 1024),
+        "text_4m": "".join(
+            random.Random(SEED).choices("lorem ipsum\nдолор 中文😀", k=4 * 1024 * 1024)
+        ).encode(),
+    }
+
+
+class CorpusServer:
+
+    def __init__(self, corpus: dict[str, bytes]) -> None:
+        self.corpus = corpus
+        self.runner = None
+        self.url = ""
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.corpus[request.match_info["name"]])
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/{name}", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        await self.runner.cleanup()
+
+
+def image_cases(corpus: dict[str, bytes]) -> dict[str, typing.Callable[[], typing.Any]]:
+    wide = Image.open(BytesIO(corpus["photo_wide"])).convert("RGBA")
+    tall = Image.open(BytesIO(corpus["photo_tall"])).convert("RGBA")
+    return {
+        "convert_tgs_to_gif[short]": lambda: convert_tgs_to_gif(
+            BytesIO(corpus["tgs_short"])
+        ),
+        "convert_tgs_to_gif[long]": lambda: convert_tgs_to_gif(
+            BytesIO(corpus["tgs_long"])
+        ),
+        "adjust_aspect_ratio[wide]": lambda: adjust_aspect_ratio(wide),
+        "adjust_aspect_ratio[tall]": lambda: adjust_aspect_ratio(tall),
+        "pad_image[wide]": lambda: pad_image(corpus["photo_wide"]),
+        "pad_image[huge]": lambda: pad_image(corpus["photo_huge"]),
+        "prepare_sticker[webp]": lambda: prepare_sticker(corpus["sticker_webp"]),
+        "resize_sticker[png]": lambda: resize_sticker(corpus["sticker_png"]),
+    }
+
+
+def discord_user(index: int) -> dict[str, typing.Any]:
+    return {
+        "id": str(1_000_000 + index),
+        "username": f"user{index}",
+        "discriminator": "0",
+        "avatar": None,
+        "global_name": f"User {index}",
+    }
+
+
+def discord_payloads(
+    members: int, messages: int
+) -> tuple[dict[str, typing.Any], list[dict[str, typing.Any]]]:
+    member = {
+        "roles": [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+    guild = {
+        "id": "1",
+        "name": "guild",
+        "owner_id": "1000000",
+        "roles": [],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+        "member_count": members,
+        "large": True,
+        "unavailable": False,
+        "channels": [
+            {
+                "id": "2",
+                "type": 0,
+                "name": "bridge",
+                "position": 0,
+                "permission_overwrites": [],
+            }
+        ],
+        "members": [
+            {**member, "user": discord_user(index)} for index in range(members)
+        ],
+        "presences": [],
+        "voice_states": [],
+        "threads": [],
+    }
+    message_payloads = [
+        {
+            "id": str(5_000_000 + index),
+            "channel_id": "2",
+            "guild_id": "1",
+            "author": discord_user(index % members),
+            "member": member,
+            "content": "lorem ipsum " * 16,
+            "timestamp": "2024-01-01T00:00:00+00:00",
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+        }
+        for index in range(messages)
+    ]
+    return guild, message_payloads
+
+
+def discord_cache(
+    lean: bool, guild: dict[str, typing.Any], messages: list[dict[str, typing.Any]]
+) -> list[int]:
+    client = create_client(lean=lean)
+    state = client._connection
+    state.parse_guild_create(guild)
+    for message in messages:
+        state.parse_message_create(message)
+    return [
+        *(user.id for user in client.users),
+        *(message.id for message in client.cached_messages),
+    ]
+
+
+def discord_cases() -> dict[str, typing.Callable[[], typing.Any]]:
+    guild, messages = discord_payloads(members=5000, messages=1000)
+    return {
+        "discord_cache[default]": lambda: discord_cache(False, guild, messages),
+        "discord_cache[lean]": lambda: discord_cache(True, guild, messages),
+    }
+
+
+def text_cases(corpus: dict[str, bytes]) -> dict[str, typing.Callable[[], typing.Any]]:
+    text = corpus["text_4m"].decode()
+    return {
+        "split_text[4m]": lambda: "".join(
+            split_text(text, TELEGRAM_TEXT_LIMIT, utf16=True)
+        ),
+    }
+
+
+def download_cases(
+    session: aiohttp.ClientSession, url: str
+) -> dict[str, typing.Callable[[], typing.Awaitable[typing.Any]]]:
+    return {
+        f"download_file[{name}]": (
+            lambda name=name: download_file(session, f"{url}/{name}")
+        )
+        for name in ("file_1m", "file_7m", "file_9m")
+    }
+
+
+@contextlib.asynccontextmanager
+async def open_cases(
+    corpus: dict[str, bytes],
+) -> typing.AsyncIterator[dict[str, typing.Callable[[], typing.Any]]]:
+    server = CorpusServer(corpus)
+    await server.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            yield {
+                **image_cases(corpus),
+                **text_cases(corpus),
+                **discord_cases(),
+                **download_cases(session, server.url),
+            }
+    finally:
+        await server.stop()
+
+
+async def call(run: typing.Callable[[], typing.Any]) -> typing.Any:
+    result = run()
+    if asyncio.iscoroutine(result):
+        result = await result
+    return result
+
+
+def reference_workload() -> int:
+    image = noise_image(512, 512).resize((1024, 1024))
+    return len(sorted(image.tobytes()[: 128 * 1024]))
+
+
+def reference_seconds(repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        reference_workload()
+        timings.append(time.perf_counter() - started_at)
+    return statistics.median(timings)
+
+
+async def time_cases(
+    corpus: dict[str, bytes], repeats: int, selected: typing.Callable[[str], bool]
+) -> dict[str, dict[str, float]]:
+    results = {}
+    reference = reference_seconds(repeats)
+    async with open_cases(corpus) as cases:
+        for name, run in cases.items():
+            if not selected(name):
+                continue
+
+            timings = []
+            for _ in range(repeats):
+                started_at = time.perf_counter()
+                result = await call(run)
+                timings.append(time.perf_counter() - started_at)
+
+            results[name] = {
+                "seconds": statistics.median(timings),
+                "reference_seconds": reference,
+                "output_bytes": output_size(result),
+            }
+    return results
+
+
+def peak_rss_child(
+    corpus: dict[str, bytes],
+    name: str,
+    connection: multiprocessing.connection.Connection,
+) -> None:
+    async def run_case() -> int:
+        async with open_cases(corpus) as cases:
+            reset_peak_rss()
+            started_kib = rss_kib()
+            await call(cases[name])
+            return peak_rss_kib() - started_kib
+
+    connection.send(asyncio.run(run_case()))
+    connection.close()
+
+
+def measure_peak_rss(corpus: dict[str, bytes], name: str) -> int:
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=peak_rss_child, args=(corpus, name, sender))
+    process.start()
+    sender.close()
+    try:
+        return max(receiver.recv(), 0)
+    finally:
+        process.join()
+
+
+def run_benchmarks(
+    corpus: dict[str, bytes], repeats: int, selected: typing.Callable[[str], bool]
+) -> dict[str, dict[str, float]]:
+    results = asyncio.run(time_cases(corpus, repeats, selected))
+    for name, result in results.items():
+        result["peak_rss_kib"] = measure_peak_rss(corpus, name)
+        logger.info(
+            "%s: %.4fs, peak RSS +%d KiB, output %d bytes",
+            name,
+            result["seconds"],
+            result["peak_rss_kib"],
+            result["output_bytes"],
+        )
+    return results
+
+
+def regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    failures = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        for metric, floor in NOISE_FLOOR.items():
+            expected = baseline[name][metric]
+            if metric == "seconds":
+                expected *= (
+                    result["reference_seconds"] / baseline[name]["reference_seconds"]
+                )
+
+            limit = max(expected * (1 + threshold), expected + floor)
+            if result[metric] > limit:
+                failures.append(
+                    f"{name} {metric}: {result[metric]:.4f} > "
+                    f"{expected:.4f} (+{threshold:.0%})"
+                )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the media pipeline")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--case")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE)
+    parser.add_argument("--save", action="store_true")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        build_corpus(), args.repeats, lambda name: not args.case or args.case in name
+    )
+
+    if args.save:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text())
+        baseline.update(results)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+        logger.info("Saved %s cases to %s", len(results), args.baseline)
+        return None
+
+    if not args.baseline.exists():
+        logger.error("No baseline at %s, run with --save", args.baseline)
+        sys.exit(1)
+
+    failures = regressions(
+        results, json.loads(args.baseline.read_text()), args.threshold
+    )
+    for failure in failures:
+        logger.error("Regression %s", failure)
+    if failures:
+        sys.exit(1)
+
+    logger.info("No regressions against %s", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
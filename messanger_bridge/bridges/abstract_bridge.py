@@ -1,14 +1,32 @@
 import abc
+import threading
 
+from leases.redis_lease import RedisLease
 from messangers.abstract_messanger import AbstractMessanger
+from settings import SheddingSettings, WorkerPoolSettings
 
 
 class AbstractBridge(abc.ABC):
 
-    def __init__(self, left: AbstractMessanger, right: AbstractMessanger) -> None:
+    def __init__(
+        self,
+        left: AbstractMessanger,
+        right: AbstractMessanger,
+        lease: RedisLease | None = None,
+        shedding: SheddingSettings | None = None,
+        workers: WorkerPoolSettings | None = None,
+    ) -> None:
         self.left = left
         self.right = right
+        self.lease = lease
+        self.shedding = shedding or SheddingSettings()
+        self.workers = workers or WorkerPoolSettings()
+        self.stopped = threading.Event()
 
     @abc.abstractmethod
     def run(self) -> None:
         pass
+
+    @abc.abstractmethod
+    def stop(self) -> None:
+        pass
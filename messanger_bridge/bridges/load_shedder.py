@@ -0,0 +1,98 @@
+import datetime
+import logging
+import time
+
+from messangers.aggregator import has_attachments
+from metrics import metrics
+from models.message import ATTACHMENT_FIELDS, Message, MessangerEnum
+from settings import SheddingSettings
+from transports.abstract_transport import AbstractTransport
+
+logger = logging.getLogger(__name__)
+
+
+def message_age(message: Message) -> float:
+    timestamp = message.timestamp
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return (datetime.datetime.now(datetime.timezone.utc) - timestamp).total_seconds()
+
+
+def strip_attachments(message: Message, text: str) -> Message:
+    update = {field: [] for field in ATTACHMENT_FIELDS}
+    update["message"] = text
+    return message.model_copy(update=update)
+
+
+def attachment_links(message: Message) -> Message:
+    links = [
+        message_file.url
+        for field in ATTACHMENT_FIELDS
+        for message_file in getattr(message, field)
+        if message_file.url
+    ]
+    return strip_attachments(message, "\n".join([message.message, *links]).strip())
+
+
+def attachment_summary(message: Message) -> Message:
+    count = sum(len(getattr(message, field)) for field in ATTACHMENT_FIELDS)
+    summary = f"[{count} attachment(s) omitted]"
+    return strip_attachments(message, "\n".join([message.message, summary]).strip())
+
+
+class LoadShedder:
+
+    def __init__(
+        self, settings: SheddingSettings, transport: AbstractTransport
+    ) -> None:
+        self.settings = settings
+        self.transport = transport
+        self.degraded = False
+        self.checked_at = 0.0
+        self.gauge = f"degraded:{self.transport.settings.queue}"
+        metrics.set(self.gauge, 0)
+
+    def update_mode(self) -> None:
+        now = time.monotonic()
+        if now - self.checked_at < self.settings.check_interval:
+            return None
+
+        self.checked_at = now
+        size = self.transport.size()
+        if not self.degraded and size > self.settings.high_watermark:
+            self.degraded = True
+            logger.warning("Queue %s backlog %s, degrade", self.gauge, size)
+        elif self.degraded and size <= self.settings.low_watermark:
+            self.degraded = False
+            logger.info("Queue %s backlog %s, full fidelity", self.gauge, size)
+        metrics.set(self.gauge, int(self.degraded))
+
+    def shed(self, message: Message) -> Message | None:
+        if self.settings.high_watermark > 0:
+            self.update_mode()
+
+        if self.settings.message_ttl > 0 and (
+            message_age(message) > self.settings.message_ttl
+        ):
+            if not message.message:
+                metrics.increment("shed_dropped")
+                return None
+
+            if has_attachments(message):
+                metrics.increment("shed_summarized")
+                return attachment_summary(message)
+
+            return message
+
+        if not self.degraded:
+            return message
+
+        if message.messanger == MessangerEnum.discord and has_attachments(message):
+            metrics.increment("shed_linked")
+            return attachment_links(message)
+
+        if message.animated_stickers:
+            metrics.increment("shed_animated_stickers")
+            return message.model_copy(update={"animated_stickers": []})
+
+        return message
@@ -3,20 +3,45 @@ import logging
 import threading
 
 from bridges.abstract_bridge import AbstractBridge
+from bridges.load_shedder import LoadShedder
+from bridges.worker_pool import WorkerPool
 from messangers.abstract_messanger import AbstractMessanger
+from models.message import Message
+from settings import SheddingSettings, WorkerPoolSettings
 
 
 logger = logging.getLogger(__name__)
 
 
-def worker(left: AbstractMessanger, right: AbstractMessanger) -> None:
+def worker(
+    left: AbstractMessanger,
+    right: AbstractMessanger,
+    shedding: SheddingSettings,
+    workers: WorkerPoolSettings,
+) -> None:
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
+    shedder = LoadShedder(settings=shedding, transport=left.transport)
+
+    async def process_message(message: Message) -> None:
+        if not await right.storage.get_recipients(source_chat_id=message.chat_id):
+            return None
+
+        message = shedder.shed(message)
+        if message is None:
+            return None
+
+        message = await left.resolve_message(message)
+        await right.send_message(message)
 
     async def process_messages():
         logger.info("process messages from %s", left.__class__.__name__)
-        for message in left.transport.messages():
-            await right.send_message(message)
+        pool = WorkerPool(
+            settings=workers,
+            name=left.transport.settings.queue,
+            process=process_message,
+        )
+        await pool.run(left.transport.messages())
 
     try:
         loop.run_until_complete(process_messages())
@@ -26,23 +51,52 @@ def worker(left: AbstractMessanger, right: AbstractMessanger) -> None:
 
 class SimpleBridge(AbstractBridge):
     def run(self) -> None:
-        left_thread = threading.Thread(
-            target=self.left.run, name=f"left_{self.left.__class__.__name__}"
-        )
-        right_thread = threading.Thread(
-            target=self.right.run, name=f"right_{self.right.__class__.__name__}"
-        )
         left_worker = threading.Thread(
-            target=worker, args=(self.left, self.right), name="left_worker"
+            target=worker,
+            args=(self.left, self.right, self.shedding, self.workers),
+            name="left_worker",
         )
         right_worker = threading.Thread(
-            target=worker, args=(self.right, self.left), name="right_worker"
+            target=worker,
+            args=(self.right, self.left, self.shedding, self.workers),
+            name="right_worker",
         )
-        left_thread.start()
-        right_thread.start()
+        if self.lease is not None and not self.lease.acquire(self.stopped):
+            return None
+
         left_worker.start()
         right_worker.start()
-        left_thread.join()
-        right_thread.join()
+        self.run_ingest()
+
         left_worker.join()
         right_worker.join()
+        if self.lease is not None:
+            self.lease.release()
+
+    def run_ingest(self) -> None:
+        if self.lease is not None:
+            threading.Thread(
+                target=self.lease.keep_alive,
+                args=(self.stopped,),
+                name="lease",
+                daemon=True,
+            ).start()
+
+        left_thread = threading.Thread(
+            target=self.left.run,
+            name=f"left_{self.left.__class__.__name__}",
+            daemon=True,
+        )
+        right_thread = threading.Thread(
+            target=self.right.run,
+            name=f"right_{self.right.__class__.__name__}",
+            daemon=True,
+        )
+        left_thread.start()
+        right_thread.start()
+
+    def stop(self) -> None:
+        logger.info("drain and stop bridge")
+        self.stopped.set()
+        self.left.transport.close()
+        self.right.transport.close()
@@ -0,0 +1,130 @@
+import asyncio
+import collections
+import logging
+import math
+import time
+import typing
+
+from metrics import metrics
+from models.message import Message
+from settings import WorkerPoolSettings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SMOOTHING = 0.2
+
+
+class WorkerPool:
+
+    def __init__(
+        self,
+        settings: WorkerPoolSettings,
+        name: str,
+        process: typing.Callable[[Message], typing.Awaitable[None]],
+    ) -> None:
+        self.settings = settings
+        self.name = name
+        self.process = process
+        self.lanes: dict[str, collections.deque[Message]] = {}
+        self.ready: asyncio.Queue[str | None] = asyncio.Queue()
+        self.workers: set[asyncio.Task] = set()
+        self.target = 0
+        self.pending = 0
+        self.delivered = 0
+        self.latency = 0.0
+        self.has_room = asyncio.Event()
+        self.has_room.set()
+        self.drained = asyncio.Event()
+        self.drained.set()
+
+    async def run(self, messages: typing.Iterator[Message]) -> None:
+        self.resize(self.settings.min_workers)
+        scaler = asyncio.create_task(self.autoscale())
+        try:
+            while True:
+                await self.has_room.wait()
+                message = await asyncio.to_thread(next, messages, None)
+                if message is None:
+                    break
+
+                self.submit(message)
+
+            await self.drained.wait()
+        finally:
+            scaler.cancel()
+            for task in self.workers:
+                task.cancel()
+            await asyncio.gather(scaler, *self.workers, return_exceptions=True)
+
+    def submit(self, message: Message) -> None:
+        lane = self.lanes.get(message.chat_id)
+        if lane is None:
+            lane = self.lanes[message.chat_id] = collections.deque()
+            self.ready.put_nowait(message.chat_id)
+        lane.append(message)
+
+        self.pending += 1
+        self.drained.clear()
+        if self.pending >= self.settings.max_pending:
+            self.has_room.clear()
+
+    async def work(self) -> None:
+        while True:
+            chat_id = await self.ready.get()
+            if chat_id is None:
+                return None
+
+            lane = self.lanes[chat_id]
+            message = lane.popleft()
+            started_at = time.monotonic()
+            try:
+                await self.process(message)
+            except Exception:
+                logger.exception("Failed to deliver message %s", message.message_id)
+            self.observe(time.monotonic() - started_at)
+
+            if lane:
+                self.ready.put_nowait(chat_id)
+            else:
+                del self.lanes[chat_id]
+
+            self.pending -= 1
+            if self.pending < self.settings.max_pending:
+                self.has_room.set()
+            if not self.pending:
+                self.drained.set()
+
+    def observe(self, latency: float) -> None:
+        self.delivered += 1
+        if self.latency:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+        else:
+            self.latency = latency
+
+    def resize(self, target: int) -> None:
+        target = max(self.settings.min_workers, min(self.settings.max_workers, target))
+        if target == self.target:
+            return None
+
+        logger.info("Resize %s workers %s -> %s", self.name, self.target, target)
+        for _ in range(target - self.target):
+            task = asyncio.create_task(self.work())
+            self.workers.add(task)
+            task.add_done_callback(self.workers.discard)
+        for _ in range(self.target - target):
+            self.ready.put_nowait(None)
+
+        self.target = target
+        metrics.set(f"workers:{self.name}", target)
+
+    async def autoscale(self) -> None:
+        while True:
+            delivered = self.delivered
+            await asyncio.sleep(self.settings.scale_interval)
+            throughput = (self.delivered - delivered) / self.settings.scale_interval
+            backlog = len(self.lanes)
+            if backlog > self.target:
+                self.resize(min(backlog, 2 * self.target))
+            elif backlog < self.target:
+                demand = math.ceil(throughput * self.latency)
+                self.resize(max(backlog, demand, self.target - 1))
@@ -0,0 +1,17 @@
+import abc
+
+from settings import DeduplicatorSettings
+
+
+class AbstractDeduplicator(abc.ABC):
+
+    def __init__(self, settings: DeduplicatorSettings) -> None:
+        self.settings = settings
+
+    @abc.abstractmethod
+    async def claim(self, key: str) -> bool:
+        pass
+
+    @abc.abstractmethod
+    async def release(self, key: str) -> None:
+        pass
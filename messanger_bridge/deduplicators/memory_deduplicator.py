@@ -0,0 +1,29 @@
+import collections
+import threading
+
+from deduplicators.abstract_deduplicator import AbstractDeduplicator
+from settings import DeduplicatorSettings
+
+
+class MemoryDeduplicator(AbstractDeduplicator):
+
+    def __init__(self, settings: DeduplicatorSettings) -> None:
+        super().__init__(settings)
+        self.cache: collections.OrderedDict[str, None] = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    async def claim(self, key: str) -> bool:
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return False
+
+            self.cache[key] = None
+            if len(self.cache) > self.settings.cache_size:
+                self.cache.popitem(last=False)
+
+        return True
+
+    async def release(self, key: str) -> None:
+        with self.lock:
+            self.cache.pop(key, None)
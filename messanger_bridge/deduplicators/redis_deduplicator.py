@@ -0,0 +1,34 @@
+import asyncio
+
+from redis.client import Redis
+
+from deduplicators.memory_deduplicator import MemoryDeduplicator
+from settings import DeduplicatorSettings
+
+
+class RedisDeduplicator(MemoryDeduplicator):
+
+    def __init__(self, settings: DeduplicatorSettings) -> None:
+        super().__init__(settings)
+        self.redis = Redis.from_url(self.settings.dsn)
+
+    async def claim(self, key: str) -> bool:
+        if not await super().claim(key):
+            return False
+
+        claimed = await asyncio.to_thread(
+            self.redis.set,
+            f"{self.settings.prefix}:{key}",
+            1,
+            nx=True,
+            ex=self.settings.ttl,
+        )
+        if not claimed:
+            await super().release(key)
+            return False
+
+        return True
+
+    async def release(self, key: str) -> None:
+        await super().release(key)
+        await asyncio.to_thread(self.redis.delete, f"{self.settings.prefix}:{key}")
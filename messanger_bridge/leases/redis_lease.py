@@ -0,0 +1,117 @@
+import logging
+import os
+import socket
+import threading
+import time
+import typing
+import uuid
+
+from redis.client import Pipeline, Redis
+from redis.exceptions import WatchError
+
+from settings import LeaseSettings
+
+logger = logging.getLogger(__name__)
+
+RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLease:
+
+    def __init__(self, settings: LeaseSettings) -> None:
+        self.settings = settings
+        self.redis = Redis.from_url(self.settings.dsn)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self.fence = 0
+        self.valid_until = 0.0
+        self.renew_script = self.redis.register_script(RENEW)
+        self.release_script = self.redis.register_script(RELEASE)
+
+    @property
+    def ttl_ms(self) -> int:
+        return int(self.settings.ttl * 1000)
+
+    @property
+    def fence_key(self) -> str:
+        return f"{self.settings.key}:fence"
+
+    def is_held(self) -> bool:
+        return time.monotonic() < self.valid_until
+
+    def try_acquire(self) -> bool:
+        started_at = time.monotonic()
+        if not self.redis.set(self.settings.key, self.owner, nx=True, px=self.ttl_ms):
+            return False
+
+        self.fence = self.redis.incr(self.fence_key)
+        self.valid_until = started_at + self.settings.ttl
+        logger.info("acquired %s with fence %s", self.settings.key, self.fence)
+        return True
+
+    def fenced(self, stage: typing.Callable[[Pipeline], None]) -> bool:
+        with self.redis.pipeline() as pipeline:
+            try:
+                pipeline.watch(self.fence_key)
+                if int(pipeline.get(self.fence_key) or 0) != self.fence:
+                    logger.error(
+                        "fence %s of %s is stale", self.fence, self.settings.key
+                    )
+                    self.valid_until = 0.0
+                    return False
+
+                pipeline.multi()
+                stage(pipeline)
+                pipeline.execute()
+            except WatchError:
+                self.valid_until = 0.0
+                return False
+
+        return True
+
+    def acquire(self, stopped: threading.Event) -> bool:
+        while not stopped.is_set():
+            if self.try_acquire():
+                return True
+
+            stopped.wait(self.settings.heartbeat)
+
+        return False
+
+    def renew(self) -> bool:
+        started_at = time.monotonic()
+        try:
+            renewed = self.renew_script(
+                keys=[self.settings.key], args=[self.owner, self.ttl_ms]
+            )
+        except Exception:
+            logger.exception("Failed to renew %s", self.settings.key)
+            return self.is_held()
+
+        if not renewed:
+            self.valid_until = 0.0
+            return False
+
+        self.valid_until = started_at + self.settings.ttl
+        return True
+
+    def keep_alive(self, stopped: threading.Event) -> None:
+        while not stopped.wait(self.settings.heartbeat):
+            if not self.renew():
+                logger.error("lost %s with fence %s", self.settings.key, self.fence)
+                os._exit(1)
+
+    def release(self) -> None:
+        self.valid_until = 0.0
+        self.release_script(keys=[self.settings.key], args=[self.owner])
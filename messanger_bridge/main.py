@@ -1,18 +1,48 @@
+import functools
+import hashlib
+import json
 import logging
 import multiprocessing
-import os
 import pathlib
+import signal
+import time
 
+import pydantic
+
+from archives.segment_archive import SegmentArchive
 from bridges.simple_bridge import SimpleBridge
+from deduplicators.memory_deduplicator import MemoryDeduplicator
+from deduplicators.redis_deduplicator import RedisDeduplicator
+from leases.redis_lease import RedisLease
 from messangers.discord_messanger import DiscordMessanger
 from messangers.telegram_messanger import TelegramMessanger
+from metrics import rss_kib
+from receivers.webhook_receiver import WebhookRoute, run_receiver
 from settings import (
     StorageSettings,
     TransportSettings,
     MessangerSettings,
+    SheddingSettings,
+    WorkerPoolSettings,
     BridgeSettings,
+    WebhookSettings,
+    DeduplicatorSettings,
+    AppSettings,
+    LeaseSettings,
+    ArchiveSettings,
+    archive_path,
+    load_bridge_settings,
 )
+from storages.abstract_storage import AbstractStorage
+from storages.redis_storage import RedisStorage
 from storages.static_storage import StaticStorage
+from storages.threaded_storage import ThreadedStorage
+from supervisor import ProcessFactory, Supervisor
+from transports.abstract_transport import AbstractTransport
+from transports.archived_transport import ArchivedTransport
+from transports.fair_redis_transport import FairRedisTransport
+from transports.fenced_transport import FencedTransport
+from transports.memory_transport import InMemoryTransport
 from transports.redis_transport import RedisTransport
 
 logging.basicConfig(
@@ -22,73 +52,268 @@ logging.basicConfig(
 )
 
 
-def run_bridge(file_name: pathlib.Path, bridge_name: str, base_dir: pathlib.Path):
-    storage_dsn = pathlib.Path(base_dir, "data", f"{bridge_name}.json")
-    bridge_settings = BridgeSettings(
-        name=bridge_name,
-        storage_dsn=str(storage_dsn),
-        transport_left_queue=f"{bridge_name}_queue_left",
-        transport_right_queue=f"{bridge_name}_queue_right",
-        _env_file=str(file_name),
+def webhook_route(bridge_settings: BridgeSettings) -> WebhookRoute:
+    return WebhookRoute(
+        token=bridge_settings.messanger_left_token,
+        secret=bridge_settings.messanger_left_webhook_secret,
+        dsn=bridge_settings.transport_dsn,
+        queue=f"{bridge_settings.name}_updates",
     )
 
-    storage_settings = StorageSettings(
-        dsn=bridge_settings.storage_dsn,
-        chat_id=bridge_settings.storage_chat_id,
+
+def create_transport(
+    bridge_settings: BridgeSettings, queue: str, base_dir: pathlib.Path
+) -> AbstractTransport:
+    if bridge_settings.transport_backend == "memory":
+        spill_dsn = ""
+        if bridge_settings.transport_spill:
+            spill_dsn = str(pathlib.Path(base_dir, "data", "spill"))
+        return InMemoryTransport(
+            settings=TransportSettings(
+                dsn=spill_dsn, queue=queue, maxsize=bridge_settings.transport_maxsize
+            )
+        )
+
+    transport_class = (
+        FairRedisTransport
+        if bridge_settings.transport_backend == "fair_redis"
+        else RedisTransport
     )
-    storage = StaticStorage(settings=storage_settings)
-    discord_transport = RedisTransport(
+    return transport_class(
         settings=TransportSettings(
             dsn=bridge_settings.transport_dsn,
-            queue=bridge_settings.transport_left_queue,
+            queue=queue,
+            quantum=bridge_settings.transport_quantum,
         )
     )
-    telegram_transport = RedisTransport(
-        settings=TransportSettings(
+
+
+def create_storage(bridge_settings: BridgeSettings) -> AbstractStorage:
+    storage_settings = StorageSettings(
+        dsn=bridge_settings.storage_dsn,
+        chat_id=bridge_settings.storage_chat_id,
+    )
+    if bridge_settings.storage_backend == "static":
+        return StaticStorage(settings=storage_settings)
+
+    storage = RedisStorage(
+        settings=StorageSettings(
             dsn=bridge_settings.transport_dsn,
-            queue=bridge_settings.transport_right_queue,
+            chat_id=bridge_settings.storage_chat_id,
+            prefix=f"{bridge_settings.name}_storage",
         )
     )
+    if pathlib.Path(storage_settings.dsn).exists() and storage.seed(
+        StaticStorage(settings=storage_settings).data
+    ):
+        logging.info("Seeded redis storage from %s", storage_settings.dsn)
+    return storage
+
+
+def run_bridge(
+    file_name: pathlib.Path,
+    bridge_name: str,
+    base_dir: pathlib.Path,
+    started_at: float,
+):
+    bridge_settings = load_bridge_settings(file_name, bridge_name, base_dir)
+    webhook_settings = WebhookSettings()
+
+    storage = ThreadedStorage(
+        storage=create_storage(bridge_settings),
+        threaded_reads=bridge_settings.storage_backend == "redis",
+    )
+    deduplicator_settings = DeduplicatorSettings(
+        dsn=bridge_settings.transport_dsn,
+        prefix=f"{bridge_name}_dedup",
+        ttl=bridge_settings.deduplicator_ttl,
+        cache_size=bridge_settings.deduplicator_cache_size,
+    )
+    if bridge_settings.transport_backend == "memory":
+        deduplicator = MemoryDeduplicator(settings=deduplicator_settings)
+    else:
+        deduplicator = RedisDeduplicator(settings=deduplicator_settings)
+    discord_transport = create_transport(
+        bridge_settings, bridge_settings.transport_left_queue, base_dir
+    )
+    telegram_transport = create_transport(
+        bridge_settings, bridge_settings.transport_right_queue, base_dir
+    )
+    lease = None
+    if bridge_settings.cluster:
+        lease = RedisLease(
+            settings=LeaseSettings(
+                dsn=bridge_settings.transport_dsn,
+                key=f"{bridge_name}_lease",
+                ttl=bridge_settings.cluster_lease_ttl,
+                heartbeat=bridge_settings.cluster_heartbeat,
+            )
+        )
+        discord_transport = FencedTransport(transport=discord_transport, lease=lease)
+        telegram_transport = FencedTransport(transport=telegram_transport, lease=lease)
+    if bridge_settings.archive:
+        archive = SegmentArchive(
+            settings=ArchiveSettings(
+                dsn=str(archive_path(base_dir, bridge_name)),
+                segment_size=bridge_settings.archive_segment_size,
+                segment_age=bridge_settings.archive_segment_age,
+            )
+        )
+        discord_transport = ArchivedTransport(
+            transport=discord_transport, archive=archive
+        )
+        telegram_transport = ArchivedTransport(
+            transport=telegram_transport, archive=archive
+        )
     discord_settings = MessangerSettings(
         token=bridge_settings.messanger_right_token,
         dsn=bridge_settings.messanger_right_dsn,
         admin_chats=bridge_settings.messanger_right_admin_chats,
         moderation=bridge_settings.messanger_right_moderation,
+        coalesce_window=bridge_settings.messanger_right_coalesce_window,
+        coalesce_limit=bridge_settings.messanger_right_coalesce_limit,
+        request_timeout=bridge_settings.request_timeout,
+        send_timeout=bridge_settings.send_timeout,
+        breaker_threshold=bridge_settings.breaker_threshold,
+        breaker_reset_timeout=bridge_settings.breaker_reset_timeout,
+        lean_client=bridge_settings.messanger_right_lean_client,
+        webhooks=bridge_settings.messanger_right_webhooks,
     )
     discord_messanger = DiscordMessanger(
-        settings=discord_settings, transport=discord_transport, storage=storage
+        settings=discord_settings,
+        transport=discord_transport,
+        storage=storage,
+        deduplicator=deduplicator,
     )
+    telegram_webhook = {}
+    if bridge_settings.messanger_left_webhook and webhook_settings.url:
+        route = webhook_route(bridge_settings)
+        telegram_webhook = {
+            "webhook_url": webhook_settings.url,
+            "webhook_secret": route.secret,
+            "webhook_dsn": route.dsn,
+            "webhook_queue": route.queue,
+        }
     telegram_settings = MessangerSettings(
         token=bridge_settings.messanger_left_token,
         dsn=bridge_settings.messanger_left_dsn,
         admin_chats=bridge_settings.messanger_left_admin_chats,
         moderation=bridge_settings.messanger_left_moderation,
+        coalesce_window=bridge_settings.messanger_left_coalesce_window,
+        coalesce_limit=bridge_settings.messanger_left_coalesce_limit,
+        request_timeout=bridge_settings.request_timeout,
+        send_timeout=bridge_settings.send_timeout,
+        breaker_threshold=bridge_settings.breaker_threshold,
+        breaker_reset_timeout=bridge_settings.breaker_reset_timeout,
+        media_group_linger=bridge_settings.messanger_left_media_group_linger,
+        **telegram_webhook,
     )
     telegram_messanger = TelegramMessanger(
-        settings=telegram_settings, transport=telegram_transport, storage=storage
+        settings=telegram_settings,
+        transport=telegram_transport,
+        storage=storage,
+        deduplicator=deduplicator,
+    )
+    shedding = SheddingSettings(
+        high_watermark=bridge_settings.shedding_high_watermark,
+        low_watermark=bridge_settings.shedding_low_watermark,
+        message_ttl=bridge_settings.shedding_message_ttl,
+        check_interval=bridge_settings.shedding_check_interval,
+    )
+    workers = WorkerPoolSettings(
+        min_workers=bridge_settings.workers_min,
+        max_workers=bridge_settings.workers_max,
+        max_pending=bridge_settings.workers_max_pending,
+        scale_interval=bridge_settings.workers_scale_interval,
+    )
+    bridge = SimpleBridge(
+        left=telegram_messanger,
+        right=discord_messanger,
+        lease=lease,
+        shedding=shedding,
+        workers=workers,
     )
-    bridge = SimpleBridge(left=telegram_messanger, right=discord_messanger)
+    logging.info(
+        "Bridge %s ready in %.2fs, rss %s KiB",
+        bridge_name,
+        time.time() - started_at,
+        rss_kib(),
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: bridge.stop())
     bridge.run()
 
 
+def bridge_process(
+    file_name: pathlib.Path, bridge_name: str, base_dir: pathlib.Path
+) -> multiprocessing.Process:
+    return multiprocessing.Process(
+        target=run_bridge,
+        args=(file_name, bridge_name, base_dir, time.time()),
+        name=bridge_name,
+    )
+
+
+def receiver_process(
+    webhook_settings: WebhookSettings, webhook_routes: list[WebhookRoute]
+) -> multiprocessing.Process:
+    return multiprocessing.Process(
+        target=run_receiver,
+        args=(webhook_settings, webhook_routes),
+        name="webhook_receiver",
+    )
+
+
+def scan_configs(
+    config_path: pathlib.Path,
+    base_dir: pathlib.Path,
+    webhook_settings: WebhookSettings,
+) -> dict[str, tuple[str, ProcessFactory] | None]:
+    desired = {}
+    webhook_routes = []
+
+    for file_name in sorted(config_path.glob(".*.env")):
+        bridge_name = file_name.name[1:-4]
+        try:
+            fingerprint = hashlib.sha256(file_name.read_bytes()).hexdigest()
+            bridge_settings = load_bridge_settings(file_name, bridge_name, base_dir)
+        except (OSError, pydantic.ValidationError):
+            logging.exception("Invalid config %s, keep current state", file_name)
+            desired[bridge_name] = None
+            continue
+
+        if bridge_settings.messanger_left_webhook:
+            webhook_routes.append(webhook_route(bridge_settings))
+
+        desired[bridge_name] = (
+            fingerprint,
+            functools.partial(bridge_process, file_name, bridge_name, base_dir),
+        )
+
+    if webhook_settings.url and webhook_routes:
+        routes_dump = json.dumps([route.model_dump() for route in webhook_routes])
+        desired["webhook_receiver"] = (
+            hashlib.sha256(routes_dump.encode()).hexdigest(),
+            functools.partial(receiver_process, webhook_settings, webhook_routes),
+        )
+
+    return desired
+
+
 def main():
     logging.info("Starting...")
-    multiprocessing.set_start_method("spawn")
+    app_settings = AppSettings()
+    multiprocessing.set_start_method(app_settings.start_method)
+    if app_settings.start_method == "forkserver":
+        multiprocessing.set_forkserver_preload(app_settings.preload_modules)
 
     base_dir = pathlib.Path(__file__).resolve().parent.parent
     config_path = pathlib.Path(base_dir, "messangers")
-    processes = []
-
-    for file_name in config_path.glob(".*.env"):
-        bridge_name = file_name.name[1:-4]
-        p = multiprocessing.Process(
-            target=run_bridge, args=(file_name, bridge_name, base_dir), name=bridge_name
-        )
-        p.start()
-        processes.append(p)
+    webhook_settings = WebhookSettings()
 
-    for p in processes:
-        p.join()
+    supervisor = Supervisor(settings=app_settings)
+    supervisor.run(
+        functools.partial(scan_configs, config_path, base_dir, webhook_settings)
+    )
 
 
 if __name__ == "__main__":
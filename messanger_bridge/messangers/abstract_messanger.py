@@ -1,8 +1,13 @@
 import abc
+import asyncio
 
+from deduplicators.abstract_deduplicator import AbstractDeduplicator
+from messangers.aggregator import MessageAggregator, has_attachments
+from messangers.circuit_breaker import CircuitBreakers
+from metrics import metrics
 from models.message import Message
 from settings import MessangerSettings
-from storages.abstract_storage import AbstractStorage
+from storages.async_abstract_storage import AsyncAbstractStorage
 from transports.abstract_transport import AbstractTransport
 
 
@@ -12,11 +17,27 @@ class AbstractMessanger(abc.ABC):
         self,
         settings: MessangerSettings,
         transport: AbstractTransport,
-        storage: AbstractStorage,
+        storage: AsyncAbstractStorage,
+        deduplicator: AbstractDeduplicator | None = None,
     ) -> None:
         self.settings = settings
         self.transport = transport
         self.storage = storage
+        self.deduplicator = deduplicator
+        self.breakers = CircuitBreakers(
+            prefix=self.__class__.__name__,
+            threshold=self.settings.breaker_threshold,
+            reset_timeout=self.settings.breaker_reset_timeout,
+            on_change=self.destination_state_changed,
+        )
+        self.background_tasks: set[asyncio.Task] = set()
+        self.bursts = None
+        if self.settings.coalesce_window > 0:
+            self.bursts = MessageAggregator(
+                linger=self.settings.coalesce_window,
+                callback=self.transport.send,
+                on_error=self.release_ingest,
+            )
 
     @abc.abstractmethod
     def run(self) -> None:
@@ -26,5 +47,66 @@ class AbstractMessanger(abc.ABC):
     async def send_message(self, message: Message) -> None:
         pass
 
+    async def resolve_message(self, message: Message) -> Message:
+        return message
+
+    def destination_state_changed(self, destination: str, state: str) -> None:
+        task = asyncio.get_running_loop().create_task(
+            self.storage.set_destination_state(destination=destination, state=state)
+        )
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    def claim_key(self, message: Message, destination: str) -> str:
+        return (
+            f"{destination}:{message.messanger.value}:"
+            f"{message.chat_id}:{message.message_id}"
+        )
+
+    async def claim(self, message: Message, destination: str) -> bool:
+        if self.deduplicator is None:
+            return True
+
+        return await self.deduplicator.claim(self.claim_key(message, destination))
+
+    async def release(self, message: Message, destination: str) -> None:
+        if self.deduplicator is None:
+            return None
+
+        await self.deduplicator.release(self.claim_key(message, destination))
+
+    async def release_ingest(self, messages: list[Message]) -> None:
+        for message in messages:
+            await self.release(message, destination="ingest")
+
     async def new_message(self, message: Message) -> None:
-        await self.transport.send(message=message)
+        if not await self.storage.is_routable(source_chat_id=message.chat_id):
+            metrics.increment("ingest_unroutable")
+            return None
+
+        if not await self.claim(message, destination="ingest"):
+            return None
+
+        try:
+            if self.bursts is None:
+                await self.transport.send(message=message)
+            elif has_attachments(message):
+                await self.bursts.flush(key=message.chat_id)
+                await self.transport.send(message=message)
+            else:
+                await self.coalesce(message)
+        except Exception:
+            await self.release(message, destination="ingest")
+            raise
+
+    async def coalesce(self, message: Message) -> None:
+        pending = self.bursts.pending.get(message.chat_id)
+        if pending is not None and (
+            pending.user_id != message.user_id
+            or message.reply_to_id is not None
+            or len(pending.message) + len(message.message) + 1
+            > self.settings.coalesce_limit
+        ):
+            await self.bursts.flush(key=message.chat_id)
+
+        await self.bursts.add(key=message.chat_id, message=message)
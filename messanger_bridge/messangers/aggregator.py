@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import typing
+
+from models.message import ATTACHMENT_FIELDS, Message
+
+logger = logging.getLogger(__name__)
+
+
+def has_attachments(message: Message) -> bool:
+    return any(getattr(message, field) for field in ATTACHMENT_FIELDS)
+
+
+def merge_messages(first: Message, second: Message) -> Message:
+    update = {
+        field: getattr(first, field) + getattr(second, field)
+        for field in ATTACHMENT_FIELDS
+    }
+    update["message"] = "\n".join(
+        item for item in (first.message, second.message) if item
+    )
+    return first.model_copy(update=update)
+
+
+class MessageAggregator:
+
+    def __init__(
+        self,
+        linger: float,
+        callback: typing.Callable[[Message], typing.Awaitable[None]],
+        on_error: (
+            typing.Callable[[list[Message]], typing.Awaitable[None]] | None
+        ) = None,
+    ) -> None:
+        self.linger = linger
+        self.callback = callback
+        self.on_error = on_error
+        self.pending: dict[str, Message] = {}
+        self.sources: dict[str, list[Message]] = {}
+        self.timers: dict[str, asyncio.Task] = {}
+
+    async def add(self, key: str, message: Message) -> None:
+        if key in self.pending:
+            self.pending[key] = merge_messages(self.pending[key], message)
+            self.sources[key].append(message)
+            return None
+
+        self.pending[key] = message
+        self.sources[key] = [message]
+        self.timers[key] = asyncio.create_task(self.linger_and_flush(key))
+
+    async def linger_and_flush(self, key: str) -> None:
+        await asyncio.sleep(self.linger)
+        self.timers.pop(key, None)
+        await self.flush(key)
+
+    async def flush(self, key: str) -> None:
+        timer = self.timers.pop(key, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+
+        message = self.pending.pop(key, None)
+        sources = self.sources.pop(key, [])
+        if message is None:
+            return None
+
+        try:
+            await self.callback(message)
+        except Exception:
+            logger.exception("Failed to flush %s", key)
+            if self.on_error is not None:
+                await self.on_error(sources)
@@ -0,0 +1,89 @@
+import enum
+import time
+import typing
+
+
+class CircuitState(enum.Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+
+    def __init__(
+        self,
+        threshold: int,
+        reset_timeout: float,
+        on_change: typing.Callable[[CircuitState], None],
+    ) -> None:
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.on_change = on_change
+        self.state = CircuitState.closed
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def set_state(self, state: CircuitState) -> None:
+        if state != self.state:
+            self.state = state
+            self.on_change(state)
+
+    def allow(self) -> bool:
+        if self.state == CircuitState.closed:
+            return True
+
+        if (
+            self.state == CircuitState.open
+            and time.monotonic() - self.opened_at >= self.reset_timeout
+        ):
+            self.set_state(CircuitState.half_open)
+
+        if self.state == CircuitState.half_open and not self.probing:
+            self.probing = True
+            return True
+
+        return False
+
+    def release(self) -> None:
+        self.probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.probing = False
+        self.set_state(CircuitState.closed)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.state == CircuitState.half_open or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            self.set_state(CircuitState.open)
+
+
+class CircuitBreakers:
+
+    def __init__(
+        self,
+        prefix: str,
+        threshold: int,
+        reset_timeout: float,
+        on_change: typing.Callable[[str, str], None],
+    ) -> None:
+        self.prefix = prefix
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.on_change = on_change
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, destination: str) -> CircuitBreaker:
+        if destination not in self.breakers:
+            name = f"{self.prefix}:{destination}"
+            self.breakers[destination] = CircuitBreaker(
+                threshold=self.threshold,
+                reset_timeout=self.reset_timeout,
+                on_change=lambda state: self.on_change(name, state.value),
+            )
+
+        return self.breakers[destination]
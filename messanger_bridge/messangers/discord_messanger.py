@@ -1,3 +1,4 @@
+import asyncio
 import gzip
 import logging
 from functools import partial
@@ -5,11 +6,21 @@ from io import BytesIO
 
 import aiohttp
 import discord
-from PIL import Image
-from rlottie_python import LottieAnimation
 
+from deduplicators.abstract_deduplicator import AbstractDeduplicator
 from messangers.abstract_messanger import AbstractMessanger
+from messangers.discord_webhooks import WebhookPool, WebhookUnavailable
+from messangers.splitter import DISCORD_TEXT_LIMIT, split_text
+from messangers.transcoder import (
+    DISCORD_UPLOAD_LIMIT,
+    IMAGE_DOWNLOAD_LIMIT,
+    fit_image,
+)
+from metrics import rss_kib
 from models.message import Message, MessangerEnum, MessageFile
+from settings import MessangerSettings
+from storages.async_abstract_storage import AsyncAbstractStorage
+from transports.abstract_transport import AbstractTransport
 
 logger = logging.getLogger(__name__)
 
@@ -18,9 +29,28 @@ class DiscordClient(discord.Client):
     pass
 
 
-async def download_file(session: aiohttp.ClientSession, url: str) -> bytes | None:
+def create_client(lean: bool) -> DiscordClient:
+    if lean:
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.guild_messages = True
+        intents.message_content = True
+        return DiscordClient(
+            intents=intents,
+            max_messages=None,
+            member_cache_flags=discord.MemberCacheFlags.none(),
+            chunk_guilds_at_startup=False,
+        )
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    return DiscordClient(intents=intents)
+
+
+async def download_file(
+    session: aiohttp.ClientSession, url: str, max_file_size: int = DISCORD_UPLOAD_LIMIT
+) -> bytes | None:
     chunks = []
-    max_file_size = 8 * 1024 * 1024
     async with session.get(url) as response:
         downloaded_size = 0
         async for chunk in response.content.iter_chunked(1024):
@@ -34,7 +64,20 @@ async def download_file(session: aiohttp.ClientSession, url: str) -> bytes | Non
         return file_bytes
 
 
+def resize_sticker(sticker_data: bytes) -> BytesIO:
+    from PIL import Image
+
+    image = Image.open(BytesIO(sticker_data)).resize((192, 192))
+    png_bytes = BytesIO()
+    image.save(png_bytes, format="PNG")
+    png_bytes.seek(0)
+    return png_bytes
+
+
 def convert_tgs_to_gif(tgs_bytes: BytesIO) -> BytesIO:
+    from PIL import Image
+    from rlottie_python import LottieAnimation
+
     tgs_bytes.seek(0)
     animation = LottieAnimation.from_tgs(tgs_bytes)
     gif_bytes = BytesIO()
@@ -88,15 +131,31 @@ def convert_tgs_to_gif(tgs_bytes: BytesIO) -> BytesIO:
 
 class DiscordMessanger(AbstractMessanger):
 
+    def __init__(
+        self,
+        settings: MessangerSettings,
+        transport: AbstractTransport,
+        storage: AsyncAbstractStorage,
+        deduplicator: AbstractDeduplicator | None = None,
+    ) -> None:
+        super().__init__(settings, transport, storage, deduplicator)
+        self.webhooks = WebhookPool([self.settings.dsn, *self.settings.webhooks])
+
     def run(self) -> None:
-        intents = discord.Intents.default()
-        intents.message_content = True
-        client = DiscordClient(intents=intents)
+        client = create_client(lean=self.settings.lean_client)
+        client.on_ready = partial(self.on_ready, client=client)
         client.on_message = partial(
             staticmethod(self.on_message), messanger=self, client=client
         )
         client.run(self.settings.token)
 
+    async def on_ready(self, *, client: DiscordClient) -> None:
+        logger.info(
+            "Discord client ready in %s guilds, rss %s KiB",
+            len(client.guilds),
+            rss_kib(),
+        )
+
     @staticmethod
     async def on_message(
         discord_message: discord.Message,
@@ -115,20 +174,22 @@ class DiscordMessanger(AbstractMessanger):
         documents = []
         stickers = []
         for attachment in discord_message.attachments:
+            message_file = MessageFile(
+                name=attachment.filename,
+                url=attachment.url,
+                width=attachment.width,
+                height=attachment.height,
+                size=attachment.size,
+            )
             if attachment.filename.endswith(".gif"):
-                message_file = MessageFile(name=attachment.filename, url=attachment.url)
                 animations.append(message_file)
             elif attachment.content_type.startswith("image"):
-                message_file = MessageFile(name=attachment.filename, url=attachment.url)
                 images.append(message_file)
             elif attachment.content_type.startswith("audio"):
-                message_file = MessageFile(name=attachment.filename, url=attachment.url)
                 audios.append(message_file)
             elif attachment.content_type.startswith("video"):
-                message_file = MessageFile(name=attachment.filename, url=attachment.url)
                 videos.append(message_file)
             else:
-                message_file = MessageFile(name=attachment.filename, url=attachment.url)
                 documents.append(message_file)
 
         for sticker in discord_message.stickers:
@@ -153,30 +214,51 @@ class DiscordMessanger(AbstractMessanger):
         await messanger.new_message(message=message)
 
     async def send_message(self, message: Message) -> None:
-        username = (
-            self.storage.get_nickname(author_id=message.chat_id) or message.username
-        )
-        recipients = self.storage.get_recipients(source_chat_id=message.chat_id)
-        if not recipients:
+        route = await self.storage.get_route(source_chat_id=message.chat_id)
+        if not route.recipients:
+            return None
+
+        username = route.nickname or message.username
+
+        if not await self.claim(message, destination="webhook"):
+            return None
+
+        breaker = self.breakers.get("webhook")
+        if not breaker.allow():
+            await self.release(message, destination="webhook")
             return None
 
-        message_content = message.message
+        message_parts = list(split_text(message.message, limit=DISCORD_TEXT_LIMIT))
+        message_content = message_parts.pop() if message_parts else ""
+        timeout = aiohttp.ClientTimeout(total=self.settings.request_timeout)
         try:
-            async with aiohttp.ClientSession() as session:
-                webhook = discord.Webhook.from_url(
-                    self.settings.dsn,
-                    session=session,
-                )
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                for message_part in message_parts:
+                    await self.webhooks.send(
+                        session,
+                        message_part,
+                        username=username,
+                    )
+
                 for image in message.images:
                     file_kwargs = {}
-                    image_data = await download_file(session, image.url)
+                    image_data = await download_file(
+                        session, image.url, max_file_size=IMAGE_DOWNLOAD_LIMIT
+                    )
+                    fitted = None
                     if image_data:
+                        fitted = await asyncio.to_thread(
+                            fit_image, image_data, image.name, DISCORD_UPLOAD_LIMIT
+                        )
+                    if fitted:
+                        name, image_data = fitted
                         buffer = BytesIO(image_data)
-                        file_kwargs["file"] = discord.File(buffer, filename=image.name)
+                        file_kwargs["file"] = discord.File(buffer, filename=name)
                     else:
                         continue
 
-                    await webhook.send(
+                    await self.webhooks.send(
+                        session,
                         message_content,
                         username=username,
                         **file_kwargs,
@@ -192,7 +274,8 @@ class DiscordMessanger(AbstractMessanger):
                     else:
                         continue
 
-                    await webhook.send(
+                    await self.webhooks.send(
+                        session,
                         message_content,
                         username=username,
                         **file_kwargs,
@@ -208,7 +291,8 @@ class DiscordMessanger(AbstractMessanger):
                     else:
                         continue
 
-                    await webhook.send(
+                    await self.webhooks.send(
+                        session,
                         message_content,
                         username=username,
                         **file_kwargs,
@@ -226,7 +310,8 @@ class DiscordMessanger(AbstractMessanger):
                     else:
                         continue
 
-                    await webhook.send(
+                    await self.webhooks.send(
+                        session,
                         message_content,
                         username=username,
                         **file_kwargs,
@@ -244,7 +329,8 @@ class DiscordMessanger(AbstractMessanger):
                     else:
                         continue
 
-                    await webhook.send(
+                    await self.webhooks.send(
+                        session,
                         message_content,
                         username=username,
                         **file_kwargs,
@@ -254,13 +340,9 @@ class DiscordMessanger(AbstractMessanger):
                 for sticker in message.stickers:
                     sticker_data = await download_file(session, sticker.url)
                     if sticker_data:
-                        buffer = BytesIO(sticker_data)
-                        image = Image.open(buffer).resize((192, 192))
-                        png_bytes = BytesIO()
-                        image.save(png_bytes, format="PNG")
-                        png_bytes.seek(0)
-                        buffer.seek(0)
-                        await webhook.send(
+                        png_bytes = resize_sticker(sticker_data)
+                        await self.webhooks.send(
+                            session,
                             message_content,
                             username=username,
                             file=discord.File(
@@ -276,7 +358,8 @@ class DiscordMessanger(AbstractMessanger):
                     if sticker_data:
                         buffer = BytesIO(sticker_data)
                         gif_buffer = convert_tgs_to_gif(buffer)
-                        await webhook.send(
+                        await self.webhooks.send(
+                            session,
                             message_content,
                             username=username,
                             file=discord.File(
@@ -286,9 +369,17 @@ class DiscordMessanger(AbstractMessanger):
                         message_content = ""
 
                 if message_content:
-                    await webhook.send(
+                    await self.webhooks.send(
+                        session,
                         message_content,
                         username=username,
                     )
+            breaker.record_success()
+        except WebhookUnavailable:
+            breaker.record_failure()
+            await self.release(message, destination="webhook")
+            logger.exception("Webhook failed")
         except Exception:
+            breaker.release()
+            await self.release(message, destination="webhook")
             logger.exception("Error sending message")
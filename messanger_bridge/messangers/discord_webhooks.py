@@ -0,0 +1,114 @@
+import asyncio
+import json
+import logging
+import time
+import typing
+
+import aiohttp
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookUnavailable(Exception):
+    pass
+
+
+class WebhookBucket:
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.remaining = 1
+        self.reset_at = 0.0
+        self.in_flight = 0
+
+    def is_ready(self, now: float) -> bool:
+        if self.remaining > 0:
+            return True
+
+        return now >= self.reset_at and self.in_flight == 0
+
+    def update(self, headers: typing.Mapping[str, str], now: float) -> None:
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if reset_after is not None:
+            self.reset_at = now + float(reset_after)
+
+    def exhaust(self, retry_after: float, now: float) -> None:
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, now + retry_after)
+
+
+class WebhookPool:
+
+    def __init__(self, urls: list[str], max_retries: int = 3) -> None:
+        self.buckets = [WebhookBucket(url) for url in dict.fromkeys(urls) if url]
+        self.max_retries = max_retries
+
+    async def acquire(self) -> WebhookBucket:
+        if not self.buckets:
+            raise WebhookUnavailable("No webhooks configured")
+
+        while True:
+            now = time.monotonic()
+            ready = [bucket for bucket in self.buckets if bucket.is_ready(now)]
+            if ready:
+                bucket = min(ready, key=lambda item: (item.in_flight, -item.remaining))
+                bucket.remaining = max(bucket.remaining - 1, 0)
+                bucket.in_flight += 1
+                return bucket
+
+            delay = min(bucket.reset_at for bucket in self.buckets) - now
+            await asyncio.sleep(max(delay, 0.01))
+
+    async def send(
+        self,
+        session: aiohttp.ClientSession,
+        content: str,
+        username: str,
+        file: discord.File | None = None,
+    ) -> None:
+        payload = {"username": username}
+        if content:
+            payload["content"] = content
+
+        for _ in range(self.max_retries + 1):
+            bucket = await self.acquire()
+            try:
+                data = aiohttp.FormData()
+                data.add_field(
+                    "payload_json",
+                    json.dumps(payload),
+                    content_type="application/json",
+                )
+                if file is not None:
+                    file.reset()
+                    data.add_field("files[0]", file.fp, filename=file.filename)
+
+                async with session.post(
+                    bucket.url, params={"wait": "true"}, data=data
+                ) as response:
+                    now = time.monotonic()
+                    bucket.update(response.headers, now)
+                    if response.status == 429:
+                        body = await response.json(content_type=None)
+                        retry_after = float(body.get("retry_after", 1))
+                        buckets = self.buckets if body.get("global") else [bucket]
+                        for item in buckets:
+                            item.exhaust(retry_after, now)
+                        logger.warning("Webhook rate limited for %ss", retry_after)
+                        continue
+
+                    if response.status >= 500:
+                        raise WebhookUnavailable(f"Webhook returned {response.status}")
+
+                    response.raise_for_status()
+                    return None
+            except (TimeoutError, aiohttp.ClientConnectionError) as error:
+                raise WebhookUnavailable("Webhook is unreachable") from error
+            finally:
+                bucket.in_flight -= 1
+
+        raise WebhookUnavailable("Webhook is rate limited")
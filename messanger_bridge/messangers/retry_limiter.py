@@ -0,0 +1,44 @@
+import asyncio
+import logging
+import typing
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 3
+
+
+class RetryAfterLimiter(BaseRateLimiter[None]):
+
+    def __init__(self, max_retries: int = MAX_RETRIES) -> None:
+        self.max_retries = max_retries
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(
+        self,
+        callback: typing.Callable[
+            ..., typing.Coroutine[typing.Any, typing.Any, typing.Any]
+        ],
+        args: typing.Any,
+        kwargs: dict[str, typing.Any],
+        endpoint: str,
+        data: dict[str, typing.Any],
+        rate_limit_args: None,
+    ) -> typing.Any:
+        for attempt in range(self.max_retries):
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as error:
+                logger.warning(
+                    "%s is rate limited, retry in %ss", endpoint, error.retry_after
+                )
+                await asyncio.sleep(error.retry_after)
+
+        return await callback(*args, **kwargs)
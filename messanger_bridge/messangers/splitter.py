@@ -0,0 +1,45 @@
+import typing
+
+TELEGRAM_TEXT_LIMIT = 4096
+TELEGRAM_CAPTION_LIMIT = 1024
+DISCORD_TEXT_LIMIT = 2000
+
+
+def utf16_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+def split_text(
+    text: str, limit: int, utf16: bool = False
+) -> typing.Generator[str, None, None]:
+    start = 0
+    while start < len(text):
+        window = text[start : start + limit]
+        if utf16:
+            encoded = window.encode("utf-16-le")
+            if len(encoded) > limit * 2:
+                window = encoded[: limit * 2].decode("utf-16-le", errors="ignore")
+        if not window:
+            raise ValueError(f"Limit {limit} is too small for {text[start]!r}")
+
+        end = start + len(window)
+        if end >= len(text) or text[end] in "\n ":
+            part, start = window, end + 1
+        else:
+            half = len(window) // 2
+            cut = window.rfind("\n", half)
+            if cut < 0:
+                cut = window.rfind(" ", half)
+
+            if cut < 0:
+                part, start = window, end
+            else:
+                part, start = window[:cut], start + cut + 1
+
+        if part.strip():
+            yield part
+
+
+def chunked[T](items: list[T], size: int) -> typing.Generator[list[T], None, None]:
+    for index in range(0, len(items), size):
+        yield items[index : index + size]
@@ -1,34 +1,86 @@
 import asyncio
+import collections
+import json
 import logging
+import time
 import typing
 from io import BytesIO
 
 import aiohttp
-from PIL import Image
+from redis.asyncio import Redis
 from telegram import (
     Update,
     Bot,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
     InputMediaPhoto,
     InputMediaAudio,
     InputMediaVideo,
     InputMediaDocument,
 )
-from telegram.error import Forbidden, BadRequest
+from telegram.error import (
+    Forbidden,
+    BadRequest,
+    NetworkError,
+    RetryAfter,
+    TelegramError,
+)
 from telegram.ext import (
     Application,
     MessageHandler,
     filters,
     ContextTypes,
     CommandHandler,
+    CallbackQueryHandler,
+    ExtBot,
 )
+from telegram.request import HTTPXRequest
 
+from deduplicators.abstract_deduplicator import AbstractDeduplicator
 from messangers.abstract_messanger import AbstractMessanger
-from models.message import Message, MessangerEnum, MessageFile
+from messangers.aggregator import MessageAggregator
+from messangers.circuit_breaker import CircuitBreakers
+from messangers.retry_limiter import RetryAfterLimiter
+from messangers.splitter import (
+    TELEGRAM_CAPTION_LIMIT,
+    TELEGRAM_TEXT_LIMIT,
+    chunked,
+    split_text,
+    utf16_length,
+)
+from messangers.transcoder import (
+    TELEGRAM_PHOTO_UPLOAD_LIMIT,
+    TELEGRAM_PHOTO_URL_LIMIT,
+    discord_cdn_variant,
+    fit_image,
+)
+from metrics import metrics
+from models.message import ATTACHMENT_FIELDS, Message, MessangerEnum, MessageFile
+from settings import MessangerSettings
+from storages.async_abstract_storage import AsyncAbstractStorage
+from transports.abstract_transport import AbstractTransport
+
+if typing.TYPE_CHECKING:
+    from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+LISTING_PAGE_SIZE = 20
+LISTING_NICKNAME_SIZE = 64
+LISTING_PREFIX_SIZE = 40
+MAX_ASPECT_RATIO = 19.0
+MAX_PHOTO_SIDE = 2560
+PROBE_SIZE = 64 * 1024
+CAPTION_FIELDS = ("images", "audios", "videos", "animations", "documents")
+FILE_URL_CACHE_SIZE = 1024
+
+
+def adjust_aspect_ratio(
+    image: "Image.Image", max_ratio: float = MAX_ASPECT_RATIO
+) -> "Image.Image":
+    from PIL import Image
 
-def adjust_aspect_ratio(image: Image.Image, max_ratio: float = 19.0) -> Image.Image:
     width, height = image.size
     aspect_ratio = width / height
 
@@ -46,14 +98,93 @@ def adjust_aspect_ratio(image: Image.Image, max_ratio: float = 19.0) -> Image.Im
     return new_image
 
 
+def prepare_sticker(sticker_data: bytes) -> BytesIO:
+    from PIL import Image
+
+    image = Image.open(BytesIO(sticker_data))
+    image = image.convert("RGBA")
+    image = image.resize((256, 256))
+    webp_bytes = BytesIO()
+    image.save(webp_bytes, format="WEBP")
+    webp_bytes.seek(0)
+    return webp_bytes
+
+
+def image_header(image_data: bytes) -> tuple[str | None, int, int] | None:
+    from PIL import Image
+
+    try:
+        with Image.open(BytesIO(image_data)) as image:
+            return image.format, *image.size
+    except Exception:
+        return None
+
+
+def needs_padding(width: int, height: int, max_ratio: float = MAX_ASPECT_RATIO) -> bool:
+    return width > height * max_ratio or height > width * max_ratio
+
+
+async def probe_image(
+    session: aiohttp.ClientSession, url: str
+) -> tuple[str | None, int, int] | None:
+    async with session.get(
+        url, headers={"Range": f"bytes=0-{PROBE_SIZE - 1}"}
+    ) as response:
+        head = await response.content.read(PROBE_SIZE)
+    return image_header(head)
+
+
+def pad_image(image_data: bytes) -> BytesIO:
+    from PIL import Image
+
+    image = Image.open(BytesIO(image_data))
+    factor = -(-max(image.size) // MAX_PHOTO_SIDE)
+    if factor > 1:
+        target = (image.width // factor, image.height // factor)
+        image.draft(image.mode, target)
+        factor = -(-max(image.size) // MAX_PHOTO_SIDE)
+        if factor > 1:
+            image = image.reduce(factor)
+
+    image = adjust_aspect_ratio(image)
+    image_bytes = BytesIO()
+    image.save(image_bytes, format="PNG")
+    if image_bytes.tell() > TELEGRAM_PHOTO_UPLOAD_LIMIT:
+        fitted = fit_image(
+            image_bytes.getvalue(), "image.png", TELEGRAM_PHOTO_UPLOAD_LIMIT
+        )
+        if fitted is not None:
+            image_bytes = BytesIO(fitted[1])
+    image_bytes.seek(0)
+    return image_bytes
+
+
 class TelegramMessanger(AbstractMessanger):
 
+    def __init__(
+        self,
+        settings: MessangerSettings,
+        transport: AbstractTransport,
+        storage: AsyncAbstractStorage,
+        deduplicator: AbstractDeduplicator | None = None,
+    ) -> None:
+        super().__init__(settings, transport, storage, deduplicator)
+        self.media_groups = MessageAggregator(
+            linger=self.settings.media_group_linger, callback=self.new_message
+        )
+        self.file_urls: collections.OrderedDict[str, tuple[str, float]] = (
+            collections.OrderedDict()
+        )
+
     def run(self) -> None:
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
         async def process_messages():
-            application = Application.builder().token(self.settings.token).build()
+            builder = Application.builder().token(self.settings.token)
+            if self.settings.webhook_url:
+                builder = builder.updater(None)
+            application = builder.build()
 
             application.add_handler(
                 MessageHandler(
@@ -97,18 +228,48 @@ class TelegramMessanger(AbstractMessanger):
                 CommandHandler("on_moderation", self.handle_on_moderation)
             )
             application.add_handler(CommandHandler("nicknames", self.handle_nicknames))
+            application.add_handler(CommandHandler("health", self.handle_health))
+            application.add_handler(
+                CallbackQueryHandler(
+                    self.handle_listing_page,
+                    pattern=r"^(users|moderation|nicknames):\d+:",
+                )
+            )
 
             await application.initialize()
             await application.start()
-            await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
-
-            await asyncio.Event().wait()
+            if self.settings.webhook_url:
+                await self.receive_updates(application)
+            else:
+                await application.updater.start_polling(allowed_updates=ALLOWED_UPDATES)
+                await asyncio.Event().wait()
 
         try:
             loop.run_until_complete(process_messages())
         finally:
             loop.close()
 
+    async def receive_updates(self, application: Application) -> None:
+        await application.bot.set_webhook(
+            url=f"{self.settings.webhook_url.rstrip('/')}/{self.settings.token}",
+            secret_token=self.settings.webhook_secret,
+            allowed_updates=ALLOWED_UPDATES,
+        )
+        redis = Redis.from_url(self.settings.webhook_dsn)
+        logger.info("receive updates from %s", self.settings.webhook_queue)
+        while True:
+            item = await redis.blpop([self.settings.webhook_queue], timeout=0)
+            if item is None:
+                continue
+
+            try:
+                update = Update.de_json(json.loads(item[1]), application.bot)
+            except Exception:
+                logger.exception("Invalid update")
+                continue
+
+            await application.update_queue.put(update)
+
     async def handle_text_message(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
@@ -140,9 +301,7 @@ class TelegramMessanger(AbstractMessanger):
         images = []
         if update.message.photo:
             file_id = update.message.photo[-1].file_id
-            file = await context.bot.get_file(file_id)
-            file_path = file.file_path
-            message_file = MessageFile(name="image.png", url=file_path)
+            message_file = MessageFile(name="image.png", file_id=file_id)
             images.append(message_file)
 
         reply_to_id = None
@@ -160,7 +319,7 @@ class TelegramMessanger(AbstractMessanger):
             reply_to_id=reply_to_id,
             images=images,
         )
-        await self.new_message(message=message)
+        await self.dispatch_message(update=update, message=message)
 
     async def handle_audio(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -171,10 +330,8 @@ class TelegramMessanger(AbstractMessanger):
         audios = []
         if update.message.audio:
             file_id = update.message.audio.file_id
-            file = await context.bot.get_file(file_id)
-            file_path = file.file_path
             message_file = MessageFile(
-                name=update.message.audio.file_name, url=file_path
+                name=update.message.audio.file_name, file_id=file_id
             )
             audios.append(message_file)
 
@@ -193,7 +350,7 @@ class TelegramMessanger(AbstractMessanger):
             reply_to_id=reply_to_id,
             audios=audios,
         )
-        await self.new_message(message=message)
+        await self.dispatch_message(update=update, message=message)
 
     async def handle_video(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -204,10 +361,8 @@ class TelegramMessanger(AbstractMessanger):
         videos = []
         if update.message.video:
             file_id = update.message.video.file_id
-            file = await context.bot.get_file(file_id)
-            file_path = file.file_path
             message_file = MessageFile(
-                name=update.message.video.file_name, url=file_path
+                name=update.message.video.file_name, file_id=file_id
             )
             videos.append(message_file)
 
@@ -226,7 +381,7 @@ class TelegramMessanger(AbstractMessanger):
             reply_to_id=reply_to_id,
             videos=videos,
         )
-        await self.new_message(message=message)
+        await self.dispatch_message(update=update, message=message)
 
     async def handle_animation(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -237,10 +392,8 @@ class TelegramMessanger(AbstractMessanger):
         animations = []
         if update.message.animation:
             file_id = update.message.animation.file_id
-            file = await context.bot.get_file(file_id)
-            file_path = file.file_path
             message_file = MessageFile(
-                name=update.message.animation.file_name, url=file_path
+                name=update.message.animation.file_name, file_id=file_id
             )
             animations.append(message_file)
 
@@ -259,7 +412,7 @@ class TelegramMessanger(AbstractMessanger):
             reply_to_id=reply_to_id,
             animations=animations,
         )
-        await self.new_message(message=message)
+        await self.dispatch_message(update=update, message=message)
 
     async def handle_attachment(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -270,10 +423,8 @@ class TelegramMessanger(AbstractMessanger):
         documents = []
         if update.message.document:
             file_id = update.message.document.file_id
-            file = await context.bot.get_file(file_id)
-            file_path = file.file_path
             message_file = MessageFile(
-                name=update.message.document.file_name, url=file_path
+                name=update.message.document.file_name, file_id=file_id
             )
             documents.append(message_file)
 
@@ -281,10 +432,8 @@ class TelegramMessanger(AbstractMessanger):
         animated_stickers = []
         if update.message.sticker:
             file_id = update.message.sticker.file_id
-            file = await context.bot.get_file(file_id)
-            file_path = file.file_path
             sticker_file = MessageFile(
-                name=update.message.sticker.set_name, url=file_path
+                name=update.message.sticker.set_name, file_id=file_id
             )
             if update.message.sticker.is_animated:
                 animated_stickers.append(sticker_file)
@@ -308,7 +457,14 @@ class TelegramMessanger(AbstractMessanger):
             stickers=stickers,
             animated_stickers=animated_stickers,
         )
-        await self.new_message(message=message)
+        await self.dispatch_message(update=update, message=message)
+
+    async def dispatch_message(self, update: Update, message: Message) -> None:
+        media_group_id = update.message.media_group_id
+        if media_group_id:
+            await self.media_groups.add(key=media_group_id, message=message)
+        else:
+            await self.new_message(message=message)
 
     async def handle_start(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -320,11 +476,11 @@ class TelegramMessanger(AbstractMessanger):
     async def handle_connect(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        if not self.storage.is_banned(chat_id=str(update.message.chat_id)):
-            if self.settings.moderation and not self.storage.is_moderated(
+        if not await self.storage.is_banned(chat_id=str(update.message.chat_id)):
+            if self.settings.moderation and not await self.storage.is_moderated(
                 str(update.message.chat_id)
             ):
-                self.storage.moderate(chat_id=str(update.message.chat_id))
+                await self.storage.moderate(chat_id=str(update.message.chat_id))
                 bot = Bot(self.settings.token)
                 for chat_id in self.settings.admin_chats:
                     await bot.send_message(
@@ -333,13 +489,13 @@ class TelegramMessanger(AbstractMessanger):
 
                 await update.effective_message.reply_text("Модерация")
             else:
-                self.storage.connect(source_chat_id=str(update.message.chat_id))
+                await self.storage.connect(source_chat_id=str(update.message.chat_id))
                 await update.effective_message.reply_text("Ok")
 
     async def handle_disconnect(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        self.storage.disconnect(source_chat_id=str(update.message.chat_id))
+        await self.storage.disconnect(source_chat_id=str(update.message.chat_id))
         await update.effective_message.reply_text("Ok")
 
     async def handle_ban(
@@ -349,7 +505,7 @@ class TelegramMessanger(AbstractMessanger):
             return None
 
         for chat_id in context.args:
-            self.storage.ban(chat_id=chat_id)
+            await self.storage.ban(chat_id=chat_id)
             await update.effective_message.reply_text(f"Ok {chat_id}")
 
     async def handle_unban(
@@ -359,7 +515,7 @@ class TelegramMessanger(AbstractMessanger):
             return None
 
         for chat_id in context.args:
-            self.storage.unban(chat_id=chat_id)
+            await self.storage.unban(chat_id=chat_id)
             await update.effective_message.reply_text(f"Ok {chat_id}")
 
     async def handle_list_of_users(
@@ -368,14 +524,7 @@ class TelegramMessanger(AbstractMessanger):
         if str(update.effective_user.id) not in self.settings.admin_chats:
             return None
 
-        users = self.storage.list_of_users()
-        users_result = "\n".join(
-            [f"{user.chat_id} - {user.nickname}" for user in users]
-        )
-        if users_result:
-            await update.effective_message.reply_text(users_result)
-        else:
-            await update.effective_message.reply_text("No users")
+        await self.reply_listing(update, "users", prefix=" ".join(context.args))
 
     async def handle_on_moderation(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -383,14 +532,7 @@ class TelegramMessanger(AbstractMessanger):
         if str(update.effective_user.id) not in self.settings.admin_chats:
             return None
 
-        users = self.storage.list_of_moderation()
-        users_result = "\n".join(
-            [f"{user.chat_id} - {user.nickname}" for user in users]
-        )
-        if users_result:
-            await update.effective_message.reply_text(users_result)
-        else:
-            await update.effective_message.reply_text("No users")
+        await self.reply_listing(update, "moderation", prefix=" ".join(context.args))
 
     async def handle_nicknames(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -398,14 +540,84 @@ class TelegramMessanger(AbstractMessanger):
         if str(update.effective_user.id) not in self.settings.admin_chats:
             return None
 
-        users = self.storage.list_of_nicknames()
+        await self.reply_listing(update, "nicknames", prefix=" ".join(context.args))
+
+    async def handle_health(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        if str(update.effective_user.id) not in self.settings.admin_chats:
+            return None
+
+        states = await self.storage.list_of_destination_states()
+        unhealthy = [
+            f"{destination} - {state}"
+            for destination, state in sorted(states.items())
+            if state != "closed"
+        ]
+        if not unhealthy:
+            unhealthy.append("All destinations healthy")
+
+        counters = [
+            f"{name} - {value}" for name, value in sorted(metrics.snapshot().items())
+        ]
+        await update.effective_message.reply_text("\n".join(unhealthy + counters))
+
+    async def handle_listing_page(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        query = update.callback_query
+        await query.answer()
+        if str(update.effective_user.id) not in self.settings.admin_chats:
+            return None
+
+        listing, page, prefix = query.data.split(":", 2)
+        text, reply_markup = await self.render_listing(listing, int(page), prefix)
+        await query.edit_message_text(text, reply_markup=reply_markup)
+
+    async def reply_listing(self, update: Update, listing: str, prefix: str) -> None:
+        prefix = prefix.encode()[:LISTING_PREFIX_SIZE].decode(errors="ignore")
+        text, reply_markup = await self.render_listing(listing, 0, prefix)
+        await update.effective_message.reply_text(text, reply_markup=reply_markup)
+
+    async def render_listing(
+        self, listing: str, page: int, prefix: str
+    ) -> tuple[str, InlineKeyboardMarkup | None]:
+        pages = {
+            "users": self.storage.page_of_users,
+            "moderation": self.storage.page_of_moderation,
+            "nicknames": self.storage.page_of_nicknames,
+        }
+        users, total = await pages[listing](
+            offset=page * LISTING_PAGE_SIZE, limit=LISTING_PAGE_SIZE, prefix=prefix
+        )
+        if not users:
+            return "No users", None
+
         users_result = "\n".join(
-            [f"{user.chat_id} - {user.nickname}" for user in users]
+            [
+                f"{user.chat_id} - {user.nickname[:LISTING_NICKNAME_SIZE]}"
+                for user in users
+            ]
         )
-        if users_result:
-            await update.effective_message.reply_text(users_result)
-        else:
-            await update.effective_message.reply_text("No users")
+        page_count = -(-total // LISTING_PAGE_SIZE)
+        if page_count == 1:
+            return users_result, None
+
+        buttons = []
+        if page > 0:
+            buttons.append(
+                InlineKeyboardButton(
+                    "«", callback_data=f"{listing}:{page - 1}:{prefix}"
+                )
+            )
+        if page + 1 < page_count:
+            buttons.append(
+                InlineKeyboardButton(
+                    "»", callback_data=f"{listing}:{page + 1}:{prefix}"
+                )
+            )
+        users_result = f"{users_result}\n\n{page + 1}/{page_count} ({total})"
+        return users_result, InlineKeyboardMarkup([buttons])
 
     async def handle_approve(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -415,7 +627,7 @@ class TelegramMessanger(AbstractMessanger):
 
         bot = Bot(self.settings.token)
         for chat_id in context.args:
-            self.storage.approve(chat_id=chat_id)
+            await self.storage.approve(chat_id=chat_id)
             await update.effective_message.reply_text(f"Ok {chat_id}")
             await bot.send_message(chat_id=chat_id, text="Проходите в вип заааааал")
 
@@ -428,141 +640,292 @@ class TelegramMessanger(AbstractMessanger):
                 await update.effective_message.reply_text("Не хватает аргументов")
                 return None
 
-            self.storage.set_nickname(
+            await self.storage.set_nickname(
                 author_id=str(update.message.from_user.id), nickname=nickname
             )
             await update.effective_message.reply_text(nickname)
         except IndexError:
             await update.effective_message.reply_text("Не хватает аргументов")
 
+    def create_bot(self) -> Bot:
+        return ExtBot(
+            self.settings.token,
+            request=HTTPXRequest(
+                connect_timeout=self.settings.request_timeout,
+                read_timeout=self.settings.request_timeout,
+                write_timeout=self.settings.request_timeout,
+            ),
+            rate_limiter=RetryAfterLimiter(),
+        )
+
+    async def resolve_message(self, message: Message) -> Message:
+        file_ids = {
+            message_file.file_id
+            for field in ATTACHMENT_FIELDS
+            for message_file in getattr(message, field)
+            if message_file.file_id and not message_file.url
+        }
+        if not file_ids:
+            return message
+
+        bot = self.create_bot()
+        urls = dict(
+            zip(
+                file_ids,
+                await asyncio.gather(
+                    *(self.resolve_file(bot, file_id) for file_id in file_ids)
+                ),
+            )
+        )
+        update = {}
+        for field in ATTACHMENT_FIELDS:
+            files = []
+            for message_file in getattr(message, field):
+                if message_file.file_id in urls:
+                    message_file = message_file.model_copy(
+                        update={"url": urls[message_file.file_id]}
+                    )
+                if message_file.url:
+                    files.append(message_file)
+            update[field] = files
+        return message.model_copy(update=update)
+
+    async def resolve_file(self, bot: Bot, file_id: str) -> str:
+        cached = self.file_urls.get(file_id)
+        if cached is not None and cached[1] > time.monotonic():
+            self.file_urls.move_to_end(file_id)
+            return cached[0]
+
+        try:
+            file = await bot.get_file(file_id)
+        except TelegramError:
+            logger.exception("Failed to resolve file %s", file_id)
+            return ""
+
+        self.file_urls[file_id] = (
+            file.file_path,
+            time.monotonic() + self.settings.file_url_ttl,
+        )
+        self.file_urls.move_to_end(file_id)
+        if len(self.file_urls) > FILE_URL_CACHE_SIZE:
+            self.file_urls.popitem(last=False)
+        return file.file_path
+
     async def send_message(self, message: Message) -> None:
-        output_channels = self.storage.get_recipients(source_chat_id=message.chat_id)
+        route = await self.storage.get_route(source_chat_id=message.chat_id)
+        output_channels = [
+            output_channel
+            for output_channel in route.recipients
+            if await self.claim(message, destination=output_channel)
+        ]
+        if not output_channels:
+            return None
 
         prepared_stickers = []
         for sticker in message.stickers:
             async with aiohttp.ClientSession() as session:
                 try:
                     async with session.get(sticker.url) as response:
-                        sticker_data = BytesIO(await response.read())
-                        image = Image.open(sticker_data)
-                        image = image.convert("RGBA")
-                        image = image.resize((256, 256))
-                        webp_bytes = BytesIO()
-                        image.save(webp_bytes, format="WEBP")
-                        webp_bytes.seek(0)
-                        prepared_stickers.append(webp_bytes)
+                        sticker_data = await response.read()
+                        prepared_stickers.append(prepare_sticker(sticker_data))
                 except Exception:
                     prepared_stickers.append(None)
 
-        files_cache = {}
-        bot = Bot(self.settings.token)
+        message = message.model_copy(
+            update={
+                "images": [
+                    image.model_copy(
+                        update={
+                            "url": discord_cdn_variant(
+                                image.url,
+                                image.width,
+                                image.height,
+                                image.size,
+                                MAX_PHOTO_SIDE,
+                                TELEGRAM_PHOTO_URL_LIMIT,
+                            )
+                        }
+                    )
+                    for image in message.images
+                ]
+            }
+        )
+        files_cache = await self.prepare_images(message.images)
+        bot = self.create_bot()
+        username = route.nickname or message.username
+        message_content = f"{username} [{message.messanger.value}]\n{message.message}"
         for output_channel in output_channels:
-            username = self.storage.get_nickname(message.chat_id) or message.username
-            message_content = (
-                f"{username} [{message.messanger.value}]\n{message.message}"
-            )
+            breaker = self.breakers.get(output_channel)
+            if not breaker.allow():
+                await self.release(message, destination=output_channel)
+                continue
+
             try:
-                for _message_content in self.message_parts(
-                    message_content, max_size=4000
-                ):
-                    await bot.send_message(
-                        chat_id=output_channel,
-                        text=_message_content,
-                        disable_web_page_preview=True,
+                async with asyncio.timeout(self.settings.send_timeout):
+                    await self.send_to_channel(
+                        bot,
+                        output_channel,
+                        message,
+                        message_content,
+                        files_cache,
+                        prepared_stickers,
                     )
+                breaker.record_success()
+            except Forbidden:
+                breaker.record_success()
+                await self.storage.disconnect(source_chat_id=output_channel)
+                logger.exception(f"Disconnect {output_channel} because of error")
+            except BadRequest:
+                breaker.release()
+                await self.release(message, destination=output_channel)
+                logger.exception("Destination %s rejected message", output_channel)
+            except RetryAfter:
+                breaker.release()
+                await self.release(message, destination=output_channel)
+                logger.exception("Destination %s is rate limited", output_channel)
+            except (TimeoutError, NetworkError):
+                breaker.record_failure()
+                await self.release(message, destination=output_channel)
+                logger.exception("Destination %s failed", output_channel)
+            except Exception:
+                breaker.release()
+                await self.release(message, destination=output_channel)
+                logger.exception("Exception in send_message")
+
+    async def send_to_channel(
+        self,
+        bot: Bot,
+        output_channel: str,
+        message: Message,
+        message_content: str,
+        files_cache: dict[str, BytesIO],
+        prepared_stickers: list[BytesIO | None],
+    ) -> None:
+        caption = None
+        if (
+            any(getattr(message, field) for field in CAPTION_FIELDS)
+            and utf16_length(message_content) <= TELEGRAM_CAPTION_LIMIT
+        ):
+            caption = message_content
+        else:
+            for _message_content in split_text(
+                message_content, limit=TELEGRAM_TEXT_LIMIT, utf16=True
+            ):
+                await bot.send_message(
+                    chat_id=output_channel,
+                    text=_message_content,
+                    disable_web_page_preview=True,
+                )
 
-                for image_chunk in self.message_parts(message.images, max_size=10):
-                    image_input = [
-                        InputMediaPhoto(media=image.url, filename=image.name)
-                        for image in image_chunk
-                    ]
-                    if image_input:
-                        try:
-                            await bot.send_media_group(
-                                chat_id=output_channel, media=image_input
+        direct_images = [
+            image for image in message.images if image.url not in files_cache
+        ]
+        for image in message.images:
+            if image.url in files_cache:
+                image_bytes = files_cache[image.url]
+                image_bytes.seek(0)
+                await bot.send_photo(
+                    chat_id=output_channel, photo=image_bytes, caption=caption
+                )
+                caption = None
+
+        for image_chunk in chunked(direct_images, size=10):
+            image_input = [
+                InputMediaPhoto(media=image.url, filename=image.name)
+                for image in image_chunk
+            ]
+            if image_input:
+                try:
+                    await bot.send_media_group(
+                        chat_id=output_channel, media=image_input, caption=caption
+                    )
+                    caption = None
+                except BadRequest:
+                    for image in image_chunk:
+                        if image.url not in files_cache:
+                            async with aiohttp.ClientSession() as session:
+                                async with session.get(image.url) as response:
+                                    image_data = await response.read()
+                            files_cache[image.url] = await asyncio.to_thread(
+                                pad_image, image_data
                             )
-                        except BadRequest:
-                            for image in image_chunk:
-                                if image.url not in files_cache:
-                                    async with aiohttp.ClientSession() as session:
-                                        async with session.get(image.url) as response:
-                                            image_data = BytesIO(await response.read())
-                                            image_pillow = Image.open(image_data)
-                                            image_pillow = adjust_aspect_ratio(
-                                                image_pillow
-                                            )
-                                            image_bytes = BytesIO()
-                                            image_pillow.save(image_bytes, format="PNG")
-                                            image_bytes.seek(0)
-                                            files_cache[image.url] = image_bytes
-
-                                image_bytes = files_cache[image.url]
-                                image_bytes.seek(0)
-                                await bot.send_photo(
-                                    chat_id=output_channel,
-                                    photo=image_bytes,
-                                )
-
-                for audio_chunk in self.message_parts(message.audios, max_size=10):
-                    audio_input = [
-                        InputMediaAudio(media=audio.url, filename=audio.name)
-                        for audio in audio_chunk
-                    ]
-                    if audio_input:
-                        await bot.send_media_group(
-                            chat_id=output_channel, media=audio_input
-                        )
 
-                for video_chunk in self.message_parts(message.videos, max_size=10):
-                    video_input = [
-                        InputMediaVideo(media=video.url, filename=video.name)
-                        for video in video_chunk
-                    ]
-                    if video_input:
-                        await bot.send_media_group(
-                            chat_id=output_channel, media=video_input
+                        image_bytes = files_cache[image.url]
+                        image_bytes.seek(0)
+                        await bot.send_photo(
+                            chat_id=output_channel,
+                            photo=image_bytes,
+                            caption=caption,
                         )
+                        caption = None
+
+        for audio_chunk in chunked(message.audios, size=10):
+            audio_input = [
+                InputMediaAudio(media=audio.url, filename=audio.name)
+                for audio in audio_chunk
+            ]
+            if audio_input:
+                await bot.send_media_group(
+                    chat_id=output_channel, media=audio_input, caption=caption
+                )
+                caption = None
+
+        for video_chunk in chunked(message.videos, size=10):
+            video_input = [
+                InputMediaVideo(media=video.url, filename=video.name)
+                for video in video_chunk
+            ]
+            if video_input:
+                await bot.send_media_group(
+                    chat_id=output_channel, media=video_input, caption=caption
+                )
+                caption = None
 
-                for animation in message.animations:
-                    await bot.send_animation(
-                        chat_id=output_channel,
-                        animation=animation.url,
-                    )
+        for animation in message.animations:
+            await bot.send_animation(
+                chat_id=output_channel,
+                animation=animation.url,
+                caption=caption,
+            )
+            caption = None
+
+        for document_chunk in chunked(message.documents, size=10):
+            document_input = [
+                InputMediaDocument(media=document.url, filename=document.name)
+                for document in document_chunk
+            ]
+            if document_input:
+                await bot.send_media_group(
+                    chat_id=output_channel, media=document_input, caption=caption
+                )
+                caption = None
 
-                for document_chunk in self.message_parts(
-                    message.documents, max_size=10
-                ):
-                    document_input = [
-                        InputMediaDocument(media=document.url, filename=document.name)
-                        for document in document_chunk
-                    ]
-                    if document_input:
-                        await bot.send_media_group(
-                            chat_id=output_channel, media=document_input
-                        )
+        for sticker, prepared_sticker in zip(message.stickers, prepared_stickers):
+            if prepared_sticker is None:
+                continue
 
-                for sticker, prepared_sticker in zip(
-                    message.stickers, prepared_stickers
-                ):
-                    if prepared_sticker is None:
-                        continue
+            prepared_sticker.seek(0)
+            await bot.send_sticker(chat_id=output_channel, sticker=prepared_sticker)
 
-                    prepared_sticker.seek(0)
-                    await bot.send_sticker(
-                        chat_id=output_channel, sticker=prepared_sticker
-                    )
+    async def prepare_images(self, images: list[MessageFile]) -> dict[str, BytesIO]:
+        prepared = {}
+        async with aiohttp.ClientSession() as session:
+            for image in images:
+                try:
+                    if image.width and image.height:
+                        size = image.width, image.height
+                    elif header := await probe_image(session, image.url):
+                        size = header[1:]
+                    else:
+                        continue
 
-            except Forbidden:
-                self.storage.disconnect(source_chat_id=output_channel)
-                logger.exception(f"Disconnect {output_channel} because of error")
-            except Exception:
-                logger.exception("Exception in send_message")
+                    if not needs_padding(*size):
+                        continue
 
-    def message_parts[T](self, message: typing.Iterable[T], max_size: int) -> list[T]:
-        parts = []
-        while len(message) > max_size:
-            parts.append(message[:max_size])
-            message = message[max_size:]
+                    async with session.get(image.url) as response:
+                        image_data = await response.read()
+                    prepared[image.url] = await asyncio.to_thread(pad_image, image_data)
+                except Exception:
+                    logger.exception("Failed to prepare image %s", image.name)
 
-        parts.append(message)
-        return parts
+        return prepared
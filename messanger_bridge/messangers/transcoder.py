@@ -0,0 +1,87 @@
+import logging
+import pathlib
+import urllib.parse
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+
+DISCORD_UPLOAD_LIMIT = 8 * 1024 * 1024
+TELEGRAM_PHOTO_UPLOAD_LIMIT = 10 * 1024 * 1024
+TELEGRAM_PHOTO_URL_LIMIT = 5 * 1024 * 1024
+IMAGE_DOWNLOAD_LIMIT = 50 * 1024 * 1024
+DISCORD_CDN_HOSTS = ("cdn.discordapp.com", "media.discordapp.net")
+DISCORD_MEDIA_HOST = "media.discordapp.net"
+JPEG_QUALITIES = (85, 70, 55)
+MIN_IMAGE_SIDE = 320
+
+
+def fit_image(
+    image_data: bytes, name: str, limit: int, max_side: int | None = None
+) -> tuple[str, bytes] | None:
+    from PIL import Image
+
+    try:
+        image = Image.open(BytesIO(image_data))
+    except Exception:
+        return None
+
+    side = max(image.size)
+    if max_side is not None:
+        side = min(side, max_side)
+    if len(image_data) <= limit and side == max(image.size):
+        return name, image_data
+
+    if getattr(image, "is_animated", False):
+        return None
+
+    image.draft(
+        "RGB",
+        (image.width * side // max(image.size), image.height * side // max(image.size)),
+    )
+    image = image.convert("RGB")
+    while side >= MIN_IMAGE_SIDE:
+        scale = side / max(image.size)
+        resized = image
+        if scale < 1:
+            resized = image.resize(
+                (
+                    max(1, round(image.width * scale)),
+                    max(1, round(image.height * scale)),
+                ),
+                Image.Resampling.LANCZOS,
+            )
+        for quality in JPEG_QUALITIES:
+            buffer = BytesIO()
+            resized.save(buffer, format="JPEG", quality=quality, optimize=True)
+            if buffer.tell() <= limit:
+                return f"{pathlib.PurePath(name).stem}.jpg", buffer.getvalue()
+
+        side = side * 3 // 4
+
+    logger.warning("Image %s does not fit in %s bytes", name, limit)
+    return None
+
+
+def discord_cdn_variant(
+    url: str,
+    width: int | None,
+    height: int | None,
+    size: int | None,
+    max_side: int,
+    max_size: int,
+) -> str:
+    parts = urllib.parse.urlsplit(url)
+    if parts.hostname not in DISCORD_CDN_HOSTS or not width or not height:
+        return url
+
+    scale = min(max_side / max(width, height), 1)
+    if scale == 1 and (not size or size <= max_size):
+        return url
+
+    query = dict(urllib.parse.parse_qsl(parts.query))
+    query["width"] = str(max(1, round(width * scale)))
+    query["height"] = str(max(1, round(height * scale)))
+    query["format"] = "jpeg"
+    return urllib.parse.urlunsplit(
+        parts._replace(netloc=DISCORD_MEDIA_HOST, query=urllib.parse.urlencode(query))
+    )
@@ -0,0 +1,49 @@
+import collections
+import os
+import resource
+import threading
+
+
+class Metrics:
+
+    def __init__(self) -> None:
+        self.counters: collections.Counter[str] = collections.Counter()
+        self.gauges: dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def set(self, name: str, value: float) -> None:
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self) -> dict[str, float]:
+        with self.lock:
+            return {**self.counters, **self.gauges}
+
+
+def rss_kib() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def reset_peak_rss() -> None:
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def peak_rss_kib() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+metrics = Metrics()
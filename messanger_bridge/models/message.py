@@ -4,6 +4,17 @@ import enum
 import pydantic
 
 
+ATTACHMENT_FIELDS = (
+    "images",
+    "audios",
+    "videos",
+    "animations",
+    "documents",
+    "stickers",
+    "animated_stickers",
+)
+
+
 class MessangerEnum(enum.Enum):
     telegram = "telegram"
     discord = "discord"
@@ -11,7 +22,11 @@ class MessangerEnum(enum.Enum):
 
 class MessageFile(pydantic.BaseModel):
     name: str
-    url: str
+    url: str = ""
+    file_id: str | None = None
+    width: int | None = None
+    height: int | None = None
+    size: int | None = None
 
 
 class Message(pydantic.BaseModel):
@@ -0,0 +1,67 @@
+import asyncio
+import hmac
+import logging
+
+import pydantic
+from aiohttp import web
+from redis.asyncio import Redis
+
+from settings import WebhookSettings
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookRoute(pydantic.BaseModel):
+    token: str
+    secret: str
+    dsn: str
+    queue: str
+
+
+class WebhookReceiver:
+
+    def __init__(self, settings: WebhookSettings, routes: list[WebhookRoute]) -> None:
+        self.settings = settings
+        self.routes = {route.token: route for route in routes}
+        self.clients: dict[str, Redis] = {}
+
+    def client(self, dsn: str) -> Redis:
+        if dsn not in self.clients:
+            self.clients[dsn] = Redis.from_url(dsn)
+
+        return self.clients[dsn]
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        route = self.routes.get(request.match_info["token"])
+        if route is None:
+            raise web.HTTPNotFound()
+
+        secret = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(secret, route.secret):
+            raise web.HTTPForbidden()
+
+        body = await request.read()
+        await self.client(route.dsn).rpush(route.queue, body)
+        return web.Response()
+
+    async def serve(self) -> None:
+        app = web.Application()
+        app.router.add_post("/{token}", self.handle_update)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, host=self.settings.host, port=self.settings.port)
+        await site.start()
+        logger.info(
+            "webhook receiver listening on %s:%s for %s bots",
+            self.settings.host,
+            self.settings.port,
+            len(self.routes),
+        )
+        await asyncio.Event().wait()
+
+
+def run_receiver(settings: WebhookSettings, routes: list[WebhookRoute]) -> None:
+    receiver = WebhookReceiver(settings=settings, routes=routes)
+    asyncio.run(receiver.serve())
@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import datetime
+import logging
+import pathlib
+import random
+import time
+import typing
+
+from archives.segment_archive import SegmentArchive
+from main import create_storage, create_transport
+from models.message import Message, MessangerEnum
+from settings import (
+    ArchiveSettings,
+    archive_path,
+    load_bridge_settings,
+)
+from transports.abstract_transport import AbstractTransport
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger("replay")
+
+
+def jsonl_messages(path: pathlib.Path) -> typing.Generator[Message, None, None]:
+    with path.open() as f:
+        for line in f:
+            if line.strip():
+                yield Message.model_validate_json(line)
+
+
+def synthetic_messages(
+    count: int, chat_ids: list[str], messanger: MessangerEnum
+) -> typing.Generator[Message, None, None]:
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    for index in range(count):
+        chat_id = chat_ids[index % len(chat_ids)]
+        yield Message(
+            message_id=f"synthetic-{index}",
+            message=" ".join(["lorem"] * random.randint(1, 200)),
+            chat_id=chat_id,
+            user_id=chat_id,
+            username=f"user{chat_id}",
+            timestamp=started_at + datetime.timedelta(seconds=index),
+            messanger=messanger,
+        )
+
+
+class ReplayReport:
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.started_at = time.monotonic()
+        self.reported_at = self.started_at
+        self.sent = 0
+        self.lag = 0.0
+
+    def record(self, lag: float) -> None:
+        self.sent += 1
+        self.lag = lag
+        now = time.monotonic()
+        if now - self.reported_at >= self.interval:
+            self.reported_at = now
+            self.log()
+
+    def log(self) -> None:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        logger.info(
+            "sent %s messages, %.1f msg/s, lag %.3fs",
+            self.sent,
+            self.sent / elapsed,
+            self.lag,
+        )
+
+
+async def replay(
+    messages: typing.Iterable[Message],
+    transport: AbstractTransport,
+    rate: float,
+    speed: float,
+    fresh_ids: bool,
+    report: ReplayReport,
+) -> None:
+    started_at = time.monotonic()
+    first_timestamp = None
+    for index, message in enumerate(messages):
+        scheduled_at = started_at
+        if rate > 0:
+            scheduled_at = started_at + index / rate
+        if speed > 0:
+            first_timestamp = first_timestamp or message.timestamp
+            offset = (message.timestamp - first_timestamp).total_seconds() / speed
+            scheduled_at = max(scheduled_at, started_at + offset)
+
+        delay = scheduled_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if fresh_ids:
+            message = message.model_copy(
+                update={"message_id": f"{message.message_id}-replay-{started_at}"}
+            )
+
+        await transport.send(message=message)
+        report.record(lag=max(time.monotonic() - scheduled_at, 0))
+
+    report.log()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-inject messages into a bridge queue"
+    )
+    parser.add_argument("bridge")
+    parser.add_argument("--queue", choices=["left", "right"], default="right")
+    parser.add_argument(
+        "--source", choices=["archive", "jsonl", "synthetic"], default="jsonl"
+    )
+    parser.add_argument("--input", type=pathlib.Path)
+    parser.add_argument("--start", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--end", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--chat")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--chat-id", action="append", dest="chat_ids")
+    parser.add_argument("--rate", type=float, default=10.0)
+    parser.add_argument("--speed", type=float, default=0.0)
+    parser.add_argument("--fresh-ids", action="store_true")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    base_dir = pathlib.Path(__file__).resolve().parent.parent
+    file_name = pathlib.Path(base_dir, "messangers", f".{args.bridge}.env")
+    bridge_settings = load_bridge_settings(file_name, args.bridge, base_dir)
+
+    if bridge_settings.transport_backend == "memory":
+        parser.error("replay needs a redis transport_backend")
+    queue = (
+        bridge_settings.transport_left_queue
+        if args.queue == "left"
+        else bridge_settings.transport_right_queue
+    )
+    transport = create_transport(bridge_settings, queue, base_dir)
+
+    if args.source == "archive":
+        if args.start is None or args.end is None:
+            parser.error("--start and --end are required for archive source")
+        archive = SegmentArchive(
+            settings=ArchiveSettings(dsn=str(archive_path(base_dir, args.bridge)))
+        )
+        messages = archive.read(args.start, args.end, chat_id=args.chat)
+    elif args.source == "jsonl":
+        if args.input is None:
+            parser.error("--input is required for jsonl source")
+        messages = jsonl_messages(args.input)
+    else:
+        messanger = (
+            MessangerEnum.discord if args.queue == "left" else MessangerEnum.telegram
+        )
+        chat_ids = args.chat_ids
+        if not chat_ids and args.queue == "left":
+            chat_ids = [bridge_settings.storage_chat_id]
+        elif not chat_ids:
+            storage = create_storage(bridge_settings)
+            chat_ids = [user.chat_id for user in storage.list_of_users()]
+        if not chat_ids:
+            parser.error("--chat-id is required when the bridge has no users")
+        messages = synthetic_messages(args.count, chat_ids, messanger)
+
+    asyncio.run(
+        replay(
+            messages=messages,
+            transport=transport,
+            rate=args.rate,
+            speed=args.speed,
+            fresh_ids=args.fresh_ids,
+            report=ReplayReport(interval=args.report_interval),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import pathlib
+import typing
+
 import pydantic
 import pydantic_settings
 
@@ -5,6 +8,44 @@ import pydantic_settings
 class TransportSettings(pydantic_settings.BaseSettings):
     dsn: str
     queue: str
+    quantum: float = 4.0
+    maxsize: int = 1000
+
+
+class SheddingSettings(pydantic_settings.BaseSettings):
+    high_watermark: int = 0
+    low_watermark: int = 100
+    message_ttl: float = 0.0
+    check_interval: float = 5.0
+
+
+class WorkerPoolSettings(pydantic_settings.BaseSettings):
+    min_workers: int = 1
+    max_workers: int = 4
+    max_pending: int = 100
+    scale_interval: float = 1.0
+
+
+class DeduplicatorSettings(pydantic_settings.BaseSettings):
+    dsn: str
+    prefix: str
+    ttl: int = 86400
+    cache_size: int = 10000
+
+
+class LeaseSettings(pydantic_settings.BaseSettings):
+    dsn: str
+    key: str
+    ttl: float = 15.0
+    heartbeat: float = 5.0
+
+
+class ArchiveSettings(pydantic_settings.BaseSettings):
+    dsn: str
+    segment_size: int = 64 * 1024 * 1024
+    segment_age: float = 3600.0
+    batch_size: int = 500
+    flush_interval: float = 1.0
 
 
 class MessangerSettings(pydantic_settings.BaseSettings):
@@ -12,11 +53,37 @@ class MessangerSettings(pydantic_settings.BaseSettings):
     dsn: str = ""
     admin_chats: list[str] = pydantic.Field(default_factory=list)
     moderation: bool = True
+    media_group_linger: float = 1.0
+    coalesce_window: float = 0.0
+    coalesce_limit: int = 2000
+    request_timeout: float = 20.0
+    send_timeout: float = 60.0
+    breaker_threshold: int = 5
+    breaker_reset_timeout: float = 60.0
+    file_url_ttl: float = 3000.0
+    lean_client: bool = True
+    webhooks: list[str] = pydantic.Field(default_factory=list)
+    webhook_url: str = ""
+    webhook_secret: str = ""
+    webhook_dsn: str = ""
+    webhook_queue: str = ""
+
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls,
+        init_settings,
+        env_settings,
+        dotenv_settings,
+        file_secret_settings,
+    ):
+        return (init_settings,)
 
 
 class StorageSettings(pydantic_settings.BaseSettings):
     dsn: str
     chat_id: str
+    prefix: str = ""
 
 
 class BridgeSettings(pydantic_settings.BaseSettings):
@@ -24,10 +91,42 @@ class BridgeSettings(pydantic_settings.BaseSettings):
 
     storage_dsn: str
     storage_chat_id: str
+    storage_backend: typing.Literal["static", "redis"] = "static"
 
-    transport_dsn: str
+    transport_dsn: str = ""
+    transport_backend: typing.Literal["redis", "fair_redis", "memory"] = "redis"
+    transport_maxsize: int = 1000
+    transport_spill: bool = True
     transport_left_queue: str
     transport_right_queue: str
+    transport_fair: bool = False
+    transport_quantum: float = 4.0
+
+    shedding_high_watermark: int = 0
+    shedding_low_watermark: int = 100
+    shedding_message_ttl: float = 0.0
+    shedding_check_interval: float = 5.0
+
+    workers_min: int = 1
+    workers_max: int = 4
+    workers_max_pending: int = 100
+    workers_scale_interval: float = 1.0
+
+    archive: bool = False
+    archive_segment_size: int = 64 * 1024 * 1024
+    archive_segment_age: float = 3600.0
+
+    cluster: bool = False
+    cluster_lease_ttl: float = 15.0
+    cluster_heartbeat: float = 5.0
+
+    request_timeout: float = 20.0
+    send_timeout: float = 60.0
+    breaker_threshold: int = 5
+    breaker_reset_timeout: float = 60.0
+
+    deduplicator_ttl: int = 86400
+    deduplicator_cache_size: int = 10000
 
     messanger_left_token: str
     messanger_right_token: str
@@ -37,9 +136,21 @@ class BridgeSettings(pydantic_settings.BaseSettings):
     messanger_right_admin_chats: list[str] = pydantic.Field(default_factory=list)
     messanger_left_moderation: bool = True
     messanger_right_moderation: bool = True
+    messanger_left_media_group_linger: float = 1.0
+    messanger_left_coalesce_window: float = 0.0
+    messanger_right_coalesce_window: float = 0.0
+    messanger_left_coalesce_limit: int = 2000
+    messanger_right_coalesce_limit: int = 4000
+    messanger_left_webhook: bool = False
+    messanger_left_webhook_secret: str = ""
+    messanger_right_lean_client: bool = True
+    messanger_right_webhooks: list[str] = pydantic.Field(default_factory=list)
 
     @pydantic.field_validator(
-        "messanger_left_admin_chats", "messanger_right_admin_chats", mode="before"
+        "messanger_left_admin_chats",
+        "messanger_right_admin_chats",
+        "messanger_right_webhooks",
+        mode="before",
     )
     def split_admin_chats(cls, v):
         if isinstance(v, str):
@@ -49,6 +160,77 @@ class BridgeSettings(pydantic_settings.BaseSettings):
 
         return v
 
+    @pydantic.model_validator(mode="after")
+    def check_webhook_secret(self):
+        if self.messanger_left_webhook and not self.messanger_left_webhook_secret:
+            raise ValueError("messanger_left_webhook_secret is required for webhook")
+
+        if self.transport_fair and self.transport_backend == "redis":
+            self.transport_backend = "fair_redis"
+
+        if self.transport_backend != "memory" and not self.transport_dsn:
+            raise ValueError("transport_dsn is required for redis transport_backend")
+
+        if self.messanger_left_webhook and not self.transport_dsn:
+            raise ValueError("transport_dsn is required for webhook")
+
+        if self.storage_backend == "redis" and not self.transport_dsn:
+            raise ValueError("transport_dsn is required for redis storage")
+
+        if self.cluster and self.storage_backend != "redis":
+            raise ValueError("cluster mode requires storage_backend=redis")
+
+        if self.cluster and self.transport_backend == "memory":
+            raise ValueError("cluster mode requires a redis transport_backend")
+
+        return self
+
     class Config:
         case_sensitive = False
         env_file_encoding = "utf-8"
+
+
+def archive_path(base_dir: pathlib.Path, bridge_name: str) -> pathlib.Path:
+    return pathlib.Path(base_dir, "data", "archive", bridge_name)
+
+
+def load_bridge_settings(
+    file_name: pathlib.Path, bridge_name: str, base_dir: pathlib.Path
+) -> BridgeSettings:
+    storage_dsn = pathlib.Path(base_dir, "data", f"{bridge_name}.json")
+    return BridgeSettings(
+        name=bridge_name,
+        storage_dsn=str(storage_dsn),
+        transport_left_queue=f"{bridge_name}_queue_left",
+        transport_right_queue=f"{bridge_name}_queue_right",
+        _env_file=str(file_name),
+    )
+
+
+class WebhookSettings(pydantic_settings.BaseSettings):
+    url: str = ""
+    host: str = "0.0.0.0"
+    port: int = 8080
+
+    class Config:
+        env_prefix = "webhook_"
+
+
+class AppSettings(pydantic_settings.BaseSettings):
+    start_method: typing.Literal["spawn", "forkserver", "fork"] = "spawn"
+    reload_interval: float = 5.0
+    drain_timeout: float = 30.0
+    preload_modules: list[str] = [
+        "aiohttp",
+        "discord",
+        "pottery",
+        "pydantic",
+        "redis",
+        "telegram",
+        "telegram.ext",
+        "messangers.discord_messanger",
+        "messangers.telegram_messanger",
+    ]
+
+    class Config:
+        env_prefix = "app_"
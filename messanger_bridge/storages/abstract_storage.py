@@ -19,6 +19,10 @@ class AbstractStorage(abc.ABC):
     def get_recipients(self, source_chat_id: str) -> list[str]:
         pass
 
+    @abc.abstractmethod
+    def is_routable(self, source_chat_id: str) -> bool:
+        pass
+
     @abc.abstractmethod
     def get_nickname(self, author_id: str) -> str | None:
         pass
@@ -59,6 +63,24 @@ class AbstractStorage(abc.ABC):
     def list_of_nicknames(self) -> list[UserModel]:
         return []
 
+    @abc.abstractmethod
+    def page_of_users(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return [], 0
+
+    @abc.abstractmethod
+    def page_of_moderation(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return [], 0
+
+    @abc.abstractmethod
+    def page_of_nicknames(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return [], 0
+
     @abc.abstractmethod
     def approve(self, chat_id: str) -> None:
         pass
@@ -70,3 +92,11 @@ class AbstractStorage(abc.ABC):
     @abc.abstractmethod
     def is_moderated(self, chat_id: str) -> bool:
         pass
+
+    @abc.abstractmethod
+    def set_destination_state(self, destination: str, state: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    def list_of_destination_states(self) -> dict[str, str]:
+        return {}
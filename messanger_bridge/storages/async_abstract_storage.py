@@ -0,0 +1,103 @@
+import abc
+
+import pydantic
+
+from storages.abstract_storage import UserModel
+
+
+class RouteModel(pydantic.BaseModel):
+    recipients: list[str]
+    nickname: str | None = None
+
+
+class AsyncAbstractStorage(abc.ABC):
+
+    @abc.abstractmethod
+    async def get_recipients(self, source_chat_id: str) -> list[str]:
+        pass
+
+    @abc.abstractmethod
+    async def is_routable(self, source_chat_id: str) -> bool:
+        pass
+
+    @abc.abstractmethod
+    async def get_route(self, source_chat_id: str) -> RouteModel:
+        pass
+
+    @abc.abstractmethod
+    async def get_nickname(self, author_id: str) -> str | None:
+        pass
+
+    @abc.abstractmethod
+    async def set_nickname(self, author_id: str, nickname: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def connect(self, source_chat_id: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def disconnect(self, source_chat_id: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def is_banned(self, chat_id: str) -> bool:
+        pass
+
+    @abc.abstractmethod
+    async def ban(self, chat_id: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def unban(self, chat_id: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def list_of_users(self) -> list[UserModel]:
+        return []
+
+    @abc.abstractmethod
+    async def list_of_moderation(self) -> list[UserModel]:
+        return []
+
+    @abc.abstractmethod
+    async def list_of_nicknames(self) -> list[UserModel]:
+        return []
+
+    @abc.abstractmethod
+    async def page_of_users(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return [], 0
+
+    @abc.abstractmethod
+    async def page_of_moderation(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return [], 0
+
+    @abc.abstractmethod
+    async def page_of_nicknames(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return [], 0
+
+    @abc.abstractmethod
+    async def approve(self, chat_id: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def moderate(self, chat_id: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def is_moderated(self, chat_id: str) -> bool:
+        pass
+
+    @abc.abstractmethod
+    async def set_destination_state(self, destination: str, state: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def list_of_destination_states(self) -> dict[str, str]:
+        return {}
@@ -0,0 +1,205 @@
+from redis.client import Redis
+
+from settings import StorageSettings
+from storages.abstract_storage import AbstractStorage, UserModel
+from storages.static_storage import DataModel
+
+NO_NICKNAME = "no nick"
+PREFIX_END = "\U0010ffff"
+
+DISCONNECT = """
+redis.call('srem', KEYS[1], ARGV[2])
+redis.call('srem', KEYS[2], ARGV[1])
+if redis.call('scard', KEYS[1]) == 0 then
+    redis.call('srem', KEYS[3], ARGV[1])
+end
+if redis.call('scard', KEYS[2]) == 0 then
+    redis.call('srem', KEYS[3], ARGV[2])
+end
+redis.call('zrem', KEYS[4], ARGV[3])
+return 1
+"""
+
+
+def index_member(chat_id: str, nickname: str) -> str:
+    return f"{nickname.casefold()}\0{chat_id}"
+
+
+def decode(value: bytes | None) -> str | None:
+    return value.decode() if value is not None else None
+
+
+class RedisStorage(AbstractStorage):
+
+    def __init__(self, settings: StorageSettings) -> None:
+        super().__init__(settings)
+        self.redis = Redis.from_url(self.settings.dsn)
+        self.disconnect_script = self.redis.register_script(DISCONNECT)
+
+    def seed(self, data: DataModel) -> bool:
+        if not self.redis.set(self.key("seeded"), 1, nx=True):
+            return False
+
+        for chat_id, nickname in data.nickname_map.items():
+            self.set_nickname(chat_id, nickname)
+        for chat_id in data.recipients_map.get(self.settings.chat_id, set()):
+            self.connect(chat_id)
+        for chat_id in data.on_moderation:
+            self.moderate(chat_id)
+        if data.banned_users:
+            self.redis.sadd(self.key("banned"), *data.banned_users)
+        if data.moderated_users:
+            self.redis.sadd(self.key("moderated"), *data.moderated_users)
+        return True
+
+    def key(self, *parts: str) -> str:
+        return ":".join([self.settings.prefix, *parts])
+
+    def display_nickname(self, chat_id: str) -> str:
+        return self.get_nickname(chat_id) or NO_NICKNAME
+
+    def get_recipients(self, source_chat_id: str) -> list[str]:
+        return [
+            item.decode()
+            for item in self.redis.smembers(self.key("recipients", source_chat_id))
+        ]
+
+    def is_routable(self, source_chat_id: str) -> bool:
+        return bool(self.redis.sismember(self.key("routable"), source_chat_id))
+
+    def get_nickname(self, author_id: str) -> str | None:
+        return decode(self.redis.hget(self.key("nicknames"), author_id))
+
+    def set_nickname(self, author_id: str, nickname: str) -> None:
+        def update(pipeline) -> None:
+            old = index_member(
+                author_id,
+                decode(pipeline.hget(self.key("nicknames"), author_id)) or NO_NICKNAME,
+            )
+            new = index_member(author_id, nickname)
+            in_indexes = [
+                index
+                for index in ("users", "moderation")
+                if pipeline.zscore(self.key("index", index), old) is not None
+            ]
+            pipeline.multi()
+            pipeline.hset(self.key("nicknames"), author_id, nickname)
+            for index in [*in_indexes, "nicknames"]:
+                pipeline.zrem(self.key("index", index), old)
+                pipeline.zadd(self.key("index", index), {new: 0})
+
+        self.redis.transaction(update, self.key("nicknames"))
+
+    def is_banned(self, chat_id: str) -> bool:
+        return bool(self.redis.sismember(self.key("banned"), chat_id))
+
+    def connect(self, source_chat_id: str) -> None:
+        member = index_member(source_chat_id, self.display_nickname(source_chat_id))
+        with self.redis.pipeline() as pipeline:
+            pipeline.sadd(self.key("recipients", source_chat_id), self.settings.chat_id)
+            pipeline.sadd(self.key("recipients", self.settings.chat_id), source_chat_id)
+            pipeline.sadd(self.key("routable"), source_chat_id, self.settings.chat_id)
+            pipeline.zadd(self.key("index", "users"), {member: 0})
+            pipeline.execute()
+
+    def disconnect(self, source_chat_id: str) -> None:
+        member = index_member(source_chat_id, self.display_nickname(source_chat_id))
+        self.disconnect_script(
+            keys=[
+                self.key("recipients", source_chat_id),
+                self.key("recipients", self.settings.chat_id),
+                self.key("routable"),
+                self.key("index", "users"),
+            ],
+            args=[source_chat_id, self.settings.chat_id, member],
+        )
+
+    def ban(self, chat_id: str) -> None:
+        self.redis.sadd(self.key("banned"), chat_id)
+        self.disconnect(chat_id)
+
+    def unban(self, chat_id: str) -> None:
+        self.redis.srem(self.key("banned"), chat_id)
+
+    def users(self, chat_ids: list[str]) -> list[UserModel]:
+        if not chat_ids:
+            return []
+
+        nicknames = self.redis.hmget(self.key("nicknames"), chat_ids)
+        return [
+            UserModel(chat_id=chat_id, nickname=decode(nickname) or NO_NICKNAME)
+            for chat_id, nickname in zip(chat_ids, nicknames)
+        ]
+
+    def list_of_users(self) -> list[UserModel]:
+        return self.users(self.get_recipients(self.settings.chat_id))
+
+    def list_of_moderation(self) -> list[UserModel]:
+        return self.users(
+            [item.decode() for item in self.redis.smembers(self.key("on_moderation"))]
+        )
+
+    def list_of_nicknames(self) -> list[UserModel]:
+        return [
+            UserModel(chat_id=chat_id.decode(), nickname=nickname.decode())
+            for chat_id, nickname in self.redis.hgetall(self.key("nicknames")).items()
+        ]
+
+    def page(
+        self, index: str, offset: int, limit: int, prefix: str
+    ) -> tuple[list[UserModel], int]:
+        prefix = prefix.casefold()
+        start, end = f"[{prefix}", f"({prefix}{PREFIX_END}"
+        with self.redis.pipeline(transaction=False) as pipeline:
+            pipeline.zrangebylex(self.key("index", index), start, end, offset, limit)
+            pipeline.zlexcount(self.key("index", index), start, end)
+            members, total = pipeline.execute()
+
+        chat_ids = [member.decode().rsplit("\0", 1)[1] for member in members]
+        return self.users(chat_ids), total
+
+    def page_of_users(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return self.page("users", offset=offset, limit=limit, prefix=prefix)
+
+    def page_of_moderation(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return self.page("moderation", offset=offset, limit=limit, prefix=prefix)
+
+    def page_of_nicknames(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return self.page("nicknames", offset=offset, limit=limit, prefix=prefix)
+
+    def approve(self, chat_id: str) -> None:
+        member = index_member(chat_id, self.display_nickname(chat_id))
+        with self.redis.pipeline() as pipeline:
+            pipeline.srem(self.key("on_moderation"), chat_id)
+            pipeline.zrem(self.key("index", "moderation"), member)
+            pipeline.sadd(self.key("moderated"), chat_id)
+            pipeline.execute()
+
+        self.connect(chat_id)
+
+    def moderate(self, chat_id: str) -> None:
+        member = index_member(chat_id, self.display_nickname(chat_id))
+        with self.redis.pipeline() as pipeline:
+            pipeline.sadd(self.key("on_moderation"), chat_id)
+            pipeline.zadd(self.key("index", "moderation"), {member: 0})
+            pipeline.execute()
+
+    def is_moderated(self, chat_id: str) -> bool:
+        return bool(self.redis.sismember(self.key("moderated"), chat_id))
+
+    def set_destination_state(self, destination: str, state: str) -> None:
+        self.redis.hset(self.key("destination_states"), destination, state)
+
+    def list_of_destination_states(self) -> dict[str, str]:
+        return {
+            destination.decode(): state.decode()
+            for destination, state in self.redis.hgetall(
+                self.key("destination_states")
+            ).items()
+        }
@@ -1,10 +1,12 @@
 import contextlib
 import pathlib
+import threading
 
 import pydantic
 
 from settings import StorageSettings
 from storages.abstract_storage import AbstractStorage, UserModel
+from storages.user_index import UserIndex
 
 
 class DataModel(pydantic.BaseModel):
@@ -26,91 +28,175 @@ class StaticStorage(AbstractStorage):
         else:
             self.data = DataModel()
 
+        self.lock = threading.RLock()
+        self.dump_lock = threading.Lock()
+        self.destination_states: dict[str, str] = {}
+        self.routable = {
+            chat_id
+            for chat_id, recipients in self.data.recipients_map.items()
+            if recipients
+        }
+        self.users_index = UserIndex()
+        self.moderation_index = UserIndex()
+        self.nicknames_index = UserIndex()
+        for chat_id in self.data.recipients_map.get(self.settings.chat_id, set()):
+            self.users_index.add(chat_id, self.display_nickname(chat_id))
+        for chat_id in self.data.on_moderation:
+            self.moderation_index.add(chat_id, self.display_nickname(chat_id))
+        for chat_id, nickname in self.data.nickname_map.items():
+            self.nicknames_index.add(chat_id, nickname)
+
+    def display_nickname(self, chat_id: str) -> str:
+        return self.data.nickname_map.get(chat_id, "no nick")
+
     def get_recipients(self, source_chat_id: str) -> list[str]:
-        return [item for item in self.data.recipients_map.get(source_chat_id, [])]
+        with self.lock:
+            return [item for item in self.data.recipients_map.get(source_chat_id, [])]
+
+    def is_routable(self, source_chat_id: str) -> bool:
+        return source_chat_id in self.routable
+
+    def update_route(self, source_chat_id: str) -> None:
+        if self.data.recipients_map.get(source_chat_id):
+            self.routable.add(source_chat_id)
+        else:
+            self.routable.discard(source_chat_id)
 
     def set_nickname(self, author_id: str, nickname: str) -> None:
-        self.data.nickname_map[author_id] = nickname
+        with self.lock:
+            self.data.nickname_map[author_id] = nickname
+            self.nicknames_index.add(author_id, nickname)
+            for index in (self.users_index, self.moderation_index):
+                if author_id in index:
+                    index.add(author_id, nickname)
         self.dump()
 
     def is_banned(self, chat_id: str) -> bool:
         return chat_id in self.data.banned_users
 
     def connect(self, source_chat_id: str) -> None:
-        if source_chat_id not in self.data.recipients_map:
-            self.data.recipients_map[source_chat_id] = set()
+        with self.lock:
+            if source_chat_id not in self.data.recipients_map:
+                self.data.recipients_map[source_chat_id] = set()
 
-        self.data.recipients_map[source_chat_id].add(self.settings.chat_id)
+            self.data.recipients_map[source_chat_id].add(self.settings.chat_id)
 
-        if self.settings.chat_id not in self.data.recipients_map:
-            self.data.recipients_map[self.settings.chat_id] = set()
+            if self.settings.chat_id not in self.data.recipients_map:
+                self.data.recipients_map[self.settings.chat_id] = set()
 
-        self.data.recipients_map[self.settings.chat_id].add(source_chat_id)
+            self.data.recipients_map[self.settings.chat_id].add(source_chat_id)
+            self.update_route(source_chat_id)
+            self.update_route(self.settings.chat_id)
+            self.users_index.add(source_chat_id, self.display_nickname(source_chat_id))
         self.dump()
 
     def disconnect(self, source_chat_id: str) -> None:
-        if source_chat_id in self.data.recipients_map:
-            with contextlib.suppress(KeyError):
-                self.data.recipients_map[source_chat_id].remove(self.settings.chat_id)
-
-        if self.settings.chat_id in self.data.recipients_map:
-            with contextlib.suppress(KeyError):
-                self.data.recipients_map[self.settings.chat_id].remove(source_chat_id)
-
+        with self.lock:
+            if source_chat_id in self.data.recipients_map:
+                with contextlib.suppress(KeyError):
+                    self.data.recipients_map[source_chat_id].remove(
+                        self.settings.chat_id
+                    )
+
+            if self.settings.chat_id in self.data.recipients_map:
+                with contextlib.suppress(KeyError):
+                    self.data.recipients_map[self.settings.chat_id].remove(
+                        source_chat_id
+                    )
+
+            self.update_route(source_chat_id)
+            self.update_route(self.settings.chat_id)
+            self.users_index.remove(source_chat_id)
         self.dump()
 
     def get_nickname(self, author_id: str) -> str | None:
         return self.data.nickname_map.get(author_id, None)
 
     def dump(self) -> None:
-        with pathlib.Path(self.settings.dsn).open("w") as f:
-            f.write(self.data.model_dump_json())
+        with self.dump_lock:
+            with self.lock:
+                payload = self.data.model_dump_json()
+            with pathlib.Path(self.settings.dsn).open("w") as f:
+                f.write(payload)
 
     def ban(self, chat_id: str) -> None:
-        self.data.banned_users.add(chat_id)
+        with self.lock:
+            self.data.banned_users.add(chat_id)
         self.disconnect(chat_id)
-        self.dump()
 
     def unban(self, chat_id: str) -> None:
-        with contextlib.suppress(KeyError):
-            self.data.banned_users.remove(chat_id)
+        with self.lock:
+            with contextlib.suppress(KeyError):
+                self.data.banned_users.remove(chat_id)
         self.dump()
 
     def list_of_users(self) -> list[UserModel]:
-        connected_users = self.data.recipients_map.get(self.settings.chat_id, set())
-        return [
-            UserModel(
-                chat_id=chat_id, nickname=self.data.nickname_map.get(chat_id, "no nick")
-            )
-            for chat_id in connected_users
-        ]
+        with self.lock:
+            connected_users = self.data.recipients_map.get(self.settings.chat_id, set())
+            return [
+                UserModel(
+                    chat_id=chat_id,
+                    nickname=self.data.nickname_map.get(chat_id, "no nick"),
+                )
+                for chat_id in connected_users
+            ]
 
     def list_of_moderation(self) -> list[UserModel]:
-        return [
-            UserModel(
-                chat_id=chat_id, nickname=self.data.nickname_map.get(chat_id, "no nick")
-            )
-            for chat_id in self.data.on_moderation
-        ]
+        with self.lock:
+            return [
+                UserModel(
+                    chat_id=chat_id,
+                    nickname=self.data.nickname_map.get(chat_id, "no nick"),
+                )
+                for chat_id in self.data.on_moderation
+            ]
 
     def list_of_nicknames(self) -> list[UserModel]:
-        return [
-            UserModel(chat_id=chat_id, nickname=nickname)
-            for chat_id, nickname in self.data.nickname_map.items()
-        ]
+        with self.lock:
+            return [
+                UserModel(chat_id=chat_id, nickname=nickname)
+                for chat_id, nickname in self.data.nickname_map.items()
+            ]
+
+    def page_of_users(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        with self.lock:
+            return self.users_index.page(offset=offset, limit=limit, prefix=prefix)
+
+    def page_of_moderation(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        with self.lock:
+            return self.moderation_index.page(offset=offset, limit=limit, prefix=prefix)
+
+    def page_of_nicknames(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        with self.lock:
+            return self.nicknames_index.page(offset=offset, limit=limit, prefix=prefix)
 
     def approve(self, chat_id: str) -> None:
-        with contextlib.suppress(KeyError):
-            self.data.on_moderation.remove(chat_id)
+        with self.lock:
+            with contextlib.suppress(KeyError):
+                self.data.on_moderation.remove(chat_id)
+            self.moderation_index.remove(chat_id)
 
-        self.data.moderated_users.add(chat_id)
+            self.data.moderated_users.add(chat_id)
 
         self.connect(chat_id)
-        self.dump()
 
     def moderate(self, chat_id: str) -> None:
-        self.data.on_moderation.add(chat_id)
+        with self.lock:
+            self.data.on_moderation.add(chat_id)
+            self.moderation_index.add(chat_id, self.display_nickname(chat_id))
         self.dump()
 
     def is_moderated(self, chat_id: str) -> bool:
         return chat_id in self.data.moderated_users
+
+    def set_destination_state(self, destination: str, state: str) -> None:
+        self.destination_states[destination] = state
+
+    def list_of_destination_states(self) -> dict[str, str]:
+        return dict(self.destination_states)
@@ -0,0 +1,92 @@
+import asyncio
+import typing
+
+from storages.abstract_storage import AbstractStorage, UserModel
+from storages.async_abstract_storage import AsyncAbstractStorage, RouteModel
+
+
+class ThreadedStorage(AsyncAbstractStorage):
+
+    def __init__(self, storage: AbstractStorage, threaded_reads: bool = False) -> None:
+        self.storage = storage
+        self.threaded_reads = threaded_reads
+
+    async def read[T](self, method: typing.Callable[..., T], *args) -> T:
+        if self.threaded_reads:
+            return await asyncio.to_thread(method, *args)
+
+        return method(*args)
+
+    async def get_recipients(self, source_chat_id: str) -> list[str]:
+        return await self.read(self.storage.get_recipients, source_chat_id)
+
+    async def is_routable(self, source_chat_id: str) -> bool:
+        return await self.read(self.storage.is_routable, source_chat_id)
+
+    async def get_route(self, source_chat_id: str) -> RouteModel:
+        return await self.read(
+            lambda: RouteModel(
+                recipients=self.storage.get_recipients(source_chat_id=source_chat_id),
+                nickname=self.storage.get_nickname(author_id=source_chat_id),
+            )
+        )
+
+    async def get_nickname(self, author_id: str) -> str | None:
+        return await self.read(self.storage.get_nickname, author_id)
+
+    async def set_nickname(self, author_id: str, nickname: str) -> None:
+        await asyncio.to_thread(self.storage.set_nickname, author_id, nickname)
+
+    async def connect(self, source_chat_id: str) -> None:
+        await asyncio.to_thread(self.storage.connect, source_chat_id)
+
+    async def disconnect(self, source_chat_id: str) -> None:
+        await asyncio.to_thread(self.storage.disconnect, source_chat_id)
+
+    async def is_banned(self, chat_id: str) -> bool:
+        return await self.read(self.storage.is_banned, chat_id)
+
+    async def ban(self, chat_id: str) -> None:
+        await asyncio.to_thread(self.storage.ban, chat_id)
+
+    async def unban(self, chat_id: str) -> None:
+        await asyncio.to_thread(self.storage.unban, chat_id)
+
+    async def list_of_users(self) -> list[UserModel]:
+        return await self.read(self.storage.list_of_users)
+
+    async def list_of_moderation(self) -> list[UserModel]:
+        return await self.read(self.storage.list_of_moderation)
+
+    async def list_of_nicknames(self) -> list[UserModel]:
+        return await self.read(self.storage.list_of_nicknames)
+
+    async def page_of_users(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return await self.read(self.storage.page_of_users, offset, limit, prefix)
+
+    async def page_of_moderation(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return await self.read(self.storage.page_of_moderation, offset, limit, prefix)
+
+    async def page_of_nicknames(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        return await self.read(self.storage.page_of_nicknames, offset, limit, prefix)
+
+    async def approve(self, chat_id: str) -> None:
+        await asyncio.to_thread(self.storage.approve, chat_id)
+
+    async def moderate(self, chat_id: str) -> None:
+        await asyncio.to_thread(self.storage.moderate, chat_id)
+
+    async def is_moderated(self, chat_id: str) -> bool:
+        return await self.read(self.storage.is_moderated, chat_id)
+
+    async def set_destination_state(self, destination: str, state: str) -> None:
+        await asyncio.to_thread(self.storage.set_destination_state, destination, state)
+
+    async def list_of_destination_states(self) -> dict[str, str]:
+        return await self.read(self.storage.list_of_destination_states)
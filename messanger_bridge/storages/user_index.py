@@ -0,0 +1,42 @@
+import bisect
+
+from storages.abstract_storage import UserModel
+
+PREFIX_END = "\U0010ffff"
+
+
+class UserIndex:
+
+    def __init__(self) -> None:
+        self.entries: list[tuple[str, str]] = []
+        self.nicknames: dict[str, str] = {}
+
+    def add(self, chat_id: str, nickname: str) -> None:
+        self.remove(chat_id)
+        self.nicknames[chat_id] = nickname
+        bisect.insort(self.entries, (nickname.casefold(), chat_id))
+
+    def remove(self, chat_id: str) -> None:
+        nickname = self.nicknames.pop(chat_id, None)
+        if nickname is None:
+            return None
+
+        index = bisect.bisect_left(self.entries, (nickname.casefold(), chat_id))
+        del self.entries[index]
+
+    def __contains__(self, chat_id: str) -> bool:
+        return chat_id in self.nicknames
+
+    def page(
+        self, offset: int, limit: int, prefix: str = ""
+    ) -> tuple[list[UserModel], int]:
+        prefix = prefix.casefold()
+        start = bisect.bisect_left(self.entries, (prefix,))
+        end = bisect.bisect_left(self.entries, (prefix + PREFIX_END,))
+        users = [
+            UserModel(chat_id=chat_id, nickname=self.nicknames[chat_id])
+            for _, chat_id in self.entries[
+                start + offset : min(start + offset + limit, end)
+            ]
+        ]
+        return users, end - start
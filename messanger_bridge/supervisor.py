@@ -0,0 +1,63 @@
+import logging
+import multiprocessing
+import time
+import typing
+
+from settings import AppSettings
+
+logger = logging.getLogger(__name__)
+
+ProcessFactory = typing.Callable[[], multiprocessing.Process]
+
+
+class Supervisor:
+
+    def __init__(self, settings: AppSettings) -> None:
+        self.settings = settings
+        self.units: dict[str, tuple[str, multiprocessing.Process]] = {}
+
+    def reconcile(self, desired: dict[str, tuple[str, ProcessFactory] | None]) -> None:
+        stale = [
+            name
+            for name, (fingerprint, _) in self.units.items()
+            if name not in desired
+            or (desired[name] is not None and desired[name][0] != fingerprint)
+        ]
+        self.stop(stale)
+
+        for name, (_, process) in list(self.units.items()):
+            if process.exitcode is not None:
+                logger.warning("%s exited with %s", name, process.exitcode)
+                del self.units[name]
+
+        for name, unit in desired.items():
+            if unit is None or name in self.units:
+                continue
+
+            fingerprint, factory = unit
+            process = factory()
+            logger.info("start %s", name)
+            process.start()
+            self.units[name] = (fingerprint, process)
+
+    def stop(self, names: list[str]) -> None:
+        processes = [self.units.pop(name)[1] for name in names]
+        for process in processes:
+            logger.info("stop %s", process.name)
+            process.terminate()
+
+        deadline = time.monotonic() + self.settings.drain_timeout
+        for process in processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning("kill %s after drain timeout", process.name)
+                process.kill()
+                process.join()
+
+    def run(
+        self,
+        scan: typing.Callable[[], dict[str, tuple[str, ProcessFactory] | None]],
+    ) -> None:
+        while True:
+            self.reconcile(scan())
+            time.sleep(self.settings.reload_interval)
@@ -9,11 +9,19 @@ class AbstractTransport(abc.ABC):
 
     def __init__(self, settings: TransportSettings) -> None:
         self.settings = settings
+        self.closed = False
 
     @abc.abstractmethod
     async def send(self, message: Message) -> None:
         pass
 
+    @abc.abstractmethod
+    def size(self) -> int:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
     @abc.abstractmethod
     def messages(self) -> typing.Generator[Message, None, None]:
         pass
@@ -0,0 +1,28 @@
+import typing
+
+from archives.abstract_archive import AbstractArchive
+from models.message import Message
+from transports.abstract_transport import AbstractTransport
+
+
+class ArchivedTransport(AbstractTransport):
+
+    def __init__(self, transport: AbstractTransport, archive: AbstractArchive) -> None:
+        super().__init__(transport.settings)
+        self.transport = transport
+        self.archive = archive
+
+    async def send(self, message: Message) -> None:
+        self.archive.append(message)
+        await self.transport.send(message=message)
+
+    def size(self) -> int:
+        return self.transport.size()
+
+    def close(self) -> None:
+        super().close()
+        self.transport.close()
+        self.archive.close()
+
+    def messages(self) -> typing.Generator[Message, None, None]:
+        return self.transport.messages()
@@ -0,0 +1,100 @@
+import contextlib
+import typing
+
+from redis.client import Pipeline, Redis
+
+from models.message import ATTACHMENT_FIELDS, Message
+from settings import TransportSettings
+from transports.abstract_transport import AbstractTransport
+
+RELEASE_SOURCE = """
+if redis.call('llen', KEYS[1]) == 0 then
+    redis.call('srem', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+def message_cost(message: Message) -> float:
+    attachments = sum(len(getattr(message, field)) for field in ATTACHMENT_FIELDS)
+    return (
+        1
+        + len(message.message) / 1000
+        + 4 * attachments
+        + 8 * len(message.animated_stickers)
+    )
+
+
+class FairRedisTransport(AbstractTransport):
+
+    def __init__(self, settings: TransportSettings) -> None:
+        super().__init__(settings)
+        self.redis = Redis.from_url(self.settings.dsn)
+        self.sources_key = f"{self.settings.queue}:sources"
+        self.ready_key = f"{self.settings.queue}:ready"
+        self.release_source = self.redis.register_script(RELEASE_SOURCE)
+
+    def source_key(self, source: str) -> str:
+        return f"{self.settings.queue}:source:{source}"
+
+    def stage(self, pipeline: Pipeline, message: Message) -> None:
+        pipeline.rpush(self.source_key(message.chat_id), message.model_dump_json())
+        pipeline.sadd(self.sources_key, message.chat_id)
+        pipeline.lpush(self.ready_key, 1)
+        pipeline.ltrim(self.ready_key, 0, 0)
+
+    async def send(self, message: Message) -> None:
+        with self.redis.pipeline() as pipeline:
+            self.stage(pipeline, message)
+            pipeline.execute()
+
+    def size(self) -> int:
+        sources = self.redis.smembers(self.sources_key)
+        with self.redis.pipeline() as pipeline:
+            for source in sources:
+                pipeline.llen(self.source_key(source.decode()))
+            return sum(pipeline.execute())
+
+    def pop(self, source: str) -> Message | None:
+        while item := self.redis.lpop(self.source_key(source)):
+            with contextlib.suppress(Exception):
+                return Message.model_validate_json(item)
+
+        self.release_source(
+            keys=[self.source_key(source), self.sources_key], args=[source]
+        )
+        return None
+
+    def messages(self) -> typing.Generator[Message, None, None]:
+        deficits: dict[str, float] = {}
+        heads: dict[str, Message] = {}
+        try:
+            while not self.closed:
+                sources = {
+                    item.decode() for item in self.redis.smembers(self.sources_key)
+                }
+                sources.update(heads)
+                if not sources:
+                    self.redis.blpop([self.ready_key], timeout=1)
+                    continue
+
+                for source in sorted(sources):
+                    deficits[source] = deficits.get(source, 0) + self.settings.quantum
+                    while not self.closed:
+                        message = heads.pop(source, None) or self.pop(source)
+                        if message is None:
+                            deficits.pop(source, None)
+                            break
+
+                        cost = message_cost(message)
+                        if cost > deficits[source]:
+                            heads[source] = message
+                            break
+
+                        deficits[source] -= cost
+                        yield message
+        finally:
+            for source, message in heads.items():
+                self.redis.lpush(self.source_key(source), message.model_dump_json())
+                self.redis.sadd(self.sources_key, source)
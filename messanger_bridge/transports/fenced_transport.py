@@ -0,0 +1,37 @@
+import logging
+import typing
+
+from leases.redis_lease import RedisLease
+from models.message import Message
+from transports.abstract_transport import AbstractTransport
+from transports.fair_redis_transport import FairRedisTransport
+from transports.redis_transport import RedisTransport
+
+logger = logging.getLogger(__name__)
+
+
+class FencedTransport(AbstractTransport):
+
+    def __init__(
+        self, transport: RedisTransport | FairRedisTransport, lease: RedisLease
+    ) -> None:
+        super().__init__(transport.settings)
+        self.transport = transport
+        self.lease = lease
+
+    async def send(self, message: Message) -> None:
+        if not self.lease.is_held() or not self.lease.fenced(
+            lambda pipeline: self.transport.stage(pipeline, message)
+        ):
+            logger.warning("Drop message %s without lease", message.message_id)
+            return None
+
+    def size(self) -> int:
+        return self.transport.size()
+
+    def close(self) -> None:
+        super().close()
+        self.transport.close()
+
+    def messages(self) -> typing.Generator[Message, None, None]:
+        return self.transport.messages()
@@ -0,0 +1,88 @@
+import asyncio
+import contextlib
+import logging
+import pathlib
+import queue
+import threading
+import typing
+
+from models.message import Message
+from settings import TransportSettings
+from transports.abstract_transport import AbstractTransport
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryTransport(AbstractTransport):
+
+    def __init__(self, settings: TransportSettings) -> None:
+        super().__init__(settings)
+        self.queue: queue.Queue[Message] = queue.Queue(maxsize=self.settings.maxsize)
+        self.lock = threading.Lock()
+        self.spill_path = None
+        self.spilled = 0
+        if self.settings.dsn:
+            spill_dir = pathlib.Path(self.settings.dsn)
+            spill_dir.mkdir(parents=True, exist_ok=True)
+            self.spill_path = spill_dir / f"{self.settings.queue}.jsonl"
+            with contextlib.suppress(FileNotFoundError):
+                with self.spill_path.open() as f:
+                    self.spilled = sum(1 for _ in f)
+
+    async def send(self, message: Message) -> None:
+        while True:
+            with self.lock:
+                if self.closed and self.spill_path is not None:
+                    self.spill(message)
+                    return None
+
+                if not self.spilled:
+                    try:
+                        self.queue.put_nowait(message)
+                        return None
+                    except queue.Full:
+                        pass
+
+                if self.spill_path is not None:
+                    self.spill(message)
+                    return None
+
+            await asyncio.sleep(0.05)
+
+    def size(self) -> int:
+        return self.queue.qsize() + self.spilled
+
+    def spill(self, message: Message) -> None:
+        with self.spill_path.open("a") as f:
+            f.write(message.model_dump_json() + "\n")
+        self.spilled += 1
+
+    def unspill(self) -> list[Message]:
+        with self.lock:
+            if not self.spilled:
+                return []
+
+            with self.spill_path.open() as f:
+                lines = f.readlines()
+            self.spill_path.unlink()
+            self.spilled = 0
+
+        messages = []
+        for line in lines:
+            with contextlib.suppress(Exception):
+                messages.append(Message.model_validate_json(line))
+        logger.info("Restored %s spilled messages", len(messages))
+        return messages
+
+    def messages(self) -> typing.Generator[Message, None, None]:
+        while not self.closed or self.size():
+            with contextlib.suppress(queue.Empty):
+                yield self.queue.get_nowait()
+                continue
+
+            if self.spilled:
+                yield from self.unspill()
+                continue
+
+            with contextlib.suppress(queue.Empty):
+                yield self.queue.get(timeout=1)
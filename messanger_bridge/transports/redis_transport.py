@@ -1,14 +1,17 @@
 import contextlib
+import json
 import typing
+import uuid
 
 import pottery
-from pottery import QueueEmptyError
-from redis.client import Redis
+from redis.client import Pipeline, Redis
 
 from models.message import Message
 from settings import TransportSettings
 from transports.abstract_transport import AbstractTransport
 
+BLOCK_MS = 30_000
+
 
 class RedisTransport(AbstractTransport):
 
@@ -16,13 +19,46 @@ class RedisTransport(AbstractTransport):
         super().__init__(settings)
         self.redis = Redis.from_url(self.settings.dsn)
         self.queue = pottery.RedisSimpleQueue(redis=self.redis, key=self.settings.queue)
+        self.wakeup_key = f"{self.settings.queue}:wakeup:{uuid.uuid4().hex}"
+
+    def stage(self, pipeline: Pipeline, message: Message) -> None:
+        pipeline.xadd(self.queue.key, {"item": json.dumps(message.model_dump_json())})
 
     async def send(self, message: Message) -> None:
-        self.queue.put(message.model_dump_json())
+        with self.redis.pipeline() as pipeline:
+            self.stage(pipeline, message)
+            pipeline.execute()
+
+    def size(self) -> int:
+        return self.queue.qsize()
+
+    def close(self) -> None:
+        super().close()
+        with contextlib.suppress(Exception), self.redis.pipeline() as pipeline:
+            pipeline.xadd(self.wakeup_key, {"closed": 1})
+            pipeline.expire(self.wakeup_key, 60)
+            pipeline.execute()
+
+    def pop(self) -> Message | None:
+        streams = self.redis.xread(
+            {self.queue.key: 0, self.wakeup_key: 0}, count=1, block=BLOCK_MS
+        )
+        for key, [(id_, fields)] in streams or []:
+            if key.decode() != self.queue.key or not self.redis.xdel(key, id_):
+                continue
 
-    def messages(self) -> typing.AsyncGenerator[Message, None]:
-        while True:
             with contextlib.suppress(Exception):
-                item = self.queue.get()
-                message = Message.model_validate_json(item)
-                yield message
+                return Message.model_validate_json(json.loads(fields[b"item"]))
+
+        return None
+
+    def messages(self) -> typing.Generator[Message, None, None]:
+        try:
+            while not self.closed:
+                message = None
+                with contextlib.suppress(Exception):
+                    message = self.pop()
+                if message is not None:
+                    yield message
+        finally:
+            self.redis.delete(self.wakeup_key)
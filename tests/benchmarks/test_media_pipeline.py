@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmark import (
+    BASELINE,
+    THRESHOLD,
+    build_corpus,
+    open_cases,
+    regressions,
+    run_benchmarks,
+)
+
+pytestmark = pytest.mark.benchmark
+
+REPEATS = 5
+
+
+def load_baseline() -> dict[str, dict[str, float]]:
+    if not BASELINE.exists():
+        return {}
+    return json.loads(BASELINE.read_text())
+
+
+@pytest.fixture(scope="module")
+def corpus() -> dict[str, bytes]:
+    return build_corpus()
+
+
+def test_baseline_covers_all_cases(corpus: dict[str, bytes]):
+    if not BASELINE.exists():
+        pytest.fail(f"No baseline at {BASELINE}, run `benchmark --save`")
+
+    async def case_names() -> set[str]:
+        async with open_cases(corpus) as cases:
+            return set(cases)
+
+    assert asyncio.run(case_names()) == set(load_baseline())
+
+
+@pytest.mark.parametrize("name", sorted(load_baseline()))
+def test_no_regression(corpus: dict[str, bytes], name: str):
+    results = run_benchmarks(corpus, REPEATS, lambda case: case == name)
+
+    assert regressions(results, load_baseline(), THRESHOLD) == []
@@ -0,0 +1,110 @@
+import asyncio
+import datetime
+
+from deduplicators.memory_deduplicator import MemoryDeduplicator
+from messangers.abstract_messanger import AbstractMessanger
+from messangers.aggregator import MessageAggregator
+from models.message import Message, MessangerEnum
+from settings import (
+    DeduplicatorSettings,
+    MessangerSettings,
+    StorageSettings,
+    TransportSettings,
+)
+from storages.static_storage import StaticStorage
+from storages.threaded_storage import ThreadedStorage
+from transports.memory_transport import InMemoryTransport
+
+
+class FailingTransport(InMemoryTransport):
+
+    async def send(self, message: Message) -> None:
+        raise ConnectionError("queue is down")
+
+
+class Messanger(AbstractMessanger):
+
+    def run(self) -> None:
+        pass
+
+    async def send_message(self, message: Message) -> None:
+        pass
+
+
+def create_message(message_id: str, text: str = "hello") -> Message:
+    return Message(
+        message_id=message_id,
+        message=text,
+        chat_id="100",
+        user_id="1",
+        username="user",
+        timestamp=datetime.datetime.now(datetime.UTC),
+        messanger=MessangerEnum.telegram,
+    )
+
+
+def test_linger_starts_with_first_message():
+    flushed: list[Message] = []
+
+    async def callback(message: Message) -> None:
+        flushed.append(message)
+
+    aggregator = MessageAggregator(linger=0.2, callback=callback)
+
+    async def run() -> None:
+        await aggregator.add("100", create_message("1", "first"))
+        await asyncio.sleep(0.15)
+        await aggregator.add("100", create_message("2", "second"))
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+
+    assert [message.message for message in flushed] == ["first\nsecond"]
+
+
+def test_failed_flush_reports_every_source_message():
+    failed: list[list[str]] = []
+
+    async def callback(message: Message) -> None:
+        raise ConnectionError("queue is down")
+
+    async def on_error(messages: list[Message]) -> None:
+        failed.append([message.message_id for message in messages])
+
+    aggregator = MessageAggregator(linger=0.01, callback=callback, on_error=on_error)
+
+    async def run() -> None:
+        await aggregator.add("100", create_message("1"))
+        await aggregator.add("100", create_message("2"))
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+
+    assert failed == [["1", "2"]]
+    assert not aggregator.pending and not aggregator.timers
+
+
+def test_failed_burst_releases_ingest_claims(tmp_path):
+    storage = StaticStorage(
+        StorageSettings(dsn=str(tmp_path / "bridge.json"), chat_id="200")
+    )
+    storage.connect("100")
+    deduplicator = MemoryDeduplicator(DeduplicatorSettings(dsn="", prefix="test"))
+    messanger = Messanger(
+        settings=MessangerSettings(token="token", coalesce_window=0.01),
+        transport=FailingTransport(TransportSettings(dsn="", queue="left")),
+        storage=ThreadedStorage(storage=storage),
+        deduplicator=deduplicator,
+    )
+    messages = [create_message("1"), create_message("2")]
+
+    async def run() -> list[bool]:
+        for message in messages:
+            await messanger.new_message(message)
+        await asyncio.sleep(0.05)
+        return [
+            await deduplicator.claim(messanger.claim_key(message, "ingest"))
+            for message in messages
+        ]
+
+    assert asyncio.run(run()) == [True, True]
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from telegram.error import RetryAfter
+
+from messangers.circuit_breaker import CircuitBreaker, CircuitState
+from messangers.retry_limiter import RetryAfterLimiter
+
+
+def open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0, on_change=lambda state: None)
+    breaker.allow()
+    breaker.record_failure()
+    return breaker
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = open_breaker()
+
+    assert breaker.allow()
+    assert breaker.state == CircuitState.half_open
+    assert not breaker.allow()
+
+
+def test_released_probe_can_be_retried():
+    breaker = open_breaker()
+    breaker.allow()
+
+    breaker.release()
+
+    assert breaker.state == CircuitState.half_open
+    assert breaker.allow()
+
+
+def test_probe_success_closes_breaker():
+    breaker = open_breaker()
+    breaker.allow()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitState.closed
+    assert breaker.allow()
+
+
+def test_retry_after_is_retried():
+    calls = []
+
+    async def callback() -> bool:
+        calls.append(None)
+        if len(calls) < 3:
+            raise RetryAfter(0)
+        return True
+
+    limiter = RetryAfterLimiter()
+    result = asyncio.run(
+        limiter.process_request(callback, (), {}, "sendMessage", {}, None)
+    )
+
+    assert result is True
+    assert len(calls) == 3
+
+
+def test_retry_after_gives_up():
+    async def callback() -> bool:
+        raise RetryAfter(0)
+
+    limiter = RetryAfterLimiter(max_retries=2)
+
+    with pytest.raises(RetryAfter):
+        asyncio.run(limiter.process_request(callback, (), {}, "sendMessage", {}, None))
@@ -0,0 +1,91 @@
+import asyncio
+import datetime
+
+import pytest
+
+from deduplicators.memory_deduplicator import MemoryDeduplicator
+from messangers.abstract_messanger import AbstractMessanger
+from models.message import Message, MessangerEnum
+from settings import (
+    DeduplicatorSettings,
+    MessangerSettings,
+    StorageSettings,
+    TransportSettings,
+)
+from storages.static_storage import StaticStorage
+from storages.threaded_storage import ThreadedStorage
+from transports.memory_transport import InMemoryTransport
+
+
+class FailingTransport(InMemoryTransport):
+
+    async def send(self, message: Message) -> None:
+        raise ConnectionError("queue is down")
+
+
+class Messanger(AbstractMessanger):
+
+    def run(self) -> None:
+        pass
+
+    async def send_message(self, message: Message) -> None:
+        pass
+
+
+def create_message(message_id: str) -> Message:
+    return Message(
+        message_id=message_id,
+        message="hello",
+        chat_id="100",
+        user_id="1",
+        username="user",
+        timestamp=datetime.datetime.now(datetime.UTC),
+        messanger=MessangerEnum.telegram,
+    )
+
+
+def test_claim_is_exclusive_until_released():
+    deduplicator = MemoryDeduplicator(DeduplicatorSettings(dsn="", prefix="test"))
+
+    async def run() -> list[bool]:
+        first = await deduplicator.claim("key")
+        second = await deduplicator.claim("key")
+        await deduplicator.release("key")
+        third = await deduplicator.claim("key")
+        return [first, second, third]
+
+    assert asyncio.run(run()) == [True, False, True]
+
+
+def test_claim_evicts_least_recent_keys():
+    deduplicator = MemoryDeduplicator(
+        DeduplicatorSettings(dsn="", prefix="test", cache_size=2)
+    )
+
+    async def run() -> bool:
+        for key in ("a", "b", "c"):
+            await deduplicator.claim(key)
+        return await deduplicator.claim("a")
+
+    assert asyncio.run(run())
+
+
+def test_failed_ingest_releases_claim(tmp_path):
+    storage = StaticStorage(
+        StorageSettings(dsn=str(tmp_path / "bridge.json"), chat_id="200")
+    )
+    storage.connect("100")
+    deduplicator = MemoryDeduplicator(DeduplicatorSettings(dsn="", prefix="test"))
+    messanger = Messanger(
+        settings=MessangerSettings(token="token"),
+        transport=FailingTransport(TransportSettings(dsn="", queue="left")),
+        storage=ThreadedStorage(storage=storage),
+        deduplicator=deduplicator,
+    )
+    message = create_message("1")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(messanger.new_message(message))
+
+    key = messanger.claim_key(message, destination="ingest")
+    assert asyncio.run(deduplicator.claim(key))
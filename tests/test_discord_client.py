@@ -0,0 +1,18 @@
+import asyncio
+
+from benchmark import discord_cache, discord_payloads
+
+
+def cached_objects(lean: bool) -> list[int]:
+    async def run() -> list[int]:
+        return discord_cache(lean, *discord_payloads(members=10, messages=20))
+
+    return asyncio.run(run())
+
+
+def test_default_client_caches_messages():
+    assert len(cached_objects(lean=False)) == 20
+
+
+def test_lean_client_caches_nothing():
+    assert cached_objects(lean=True) == []
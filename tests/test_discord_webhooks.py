@@ -0,0 +1,76 @@
+import asyncio
+import contextlib
+import time
+
+import pytest
+
+from messangers.discord_webhooks import WebhookBucket, WebhookPool, WebhookUnavailable
+
+
+class Response:
+
+    def __init__(self, status: int, body: dict, headers: dict[str, str]) -> None:
+        self.status = status
+        self.body = body
+        self.headers = headers
+
+    async def json(self, content_type: str | None = None) -> dict:
+        return self.body
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class Session:
+
+    def __init__(self, responses: list[Response]) -> None:
+        self.responses = responses
+        self.urls: list[str] = []
+
+    @contextlib.asynccontextmanager
+    async def post(self, url: str, params: dict, data):
+        self.urls.append(url)
+        yield self.responses.pop(0)
+
+
+def rate_limited(retry_after: float = 0.0) -> Response:
+    return Response(429, {"retry_after": retry_after}, {})
+
+
+def test_rate_limit_retries_are_capped():
+    pool = WebhookPool(["https://hook"], max_retries=2)
+    session = Session([rate_limited() for _ in range(3)])
+
+    with pytest.raises(WebhookUnavailable):
+        asyncio.run(pool.send(session, "hello", username="user"))
+
+    assert len(session.urls) == 3
+    assert pool.buckets[0].in_flight == 0
+
+
+def test_rate_limit_retry_uses_next_ready_bucket():
+    pool = WebhookPool(["https://first", "https://second"])
+    session = Session([rate_limited(60.0), Response(200, {}, {})])
+
+    asyncio.run(pool.send(session, "hello", username="user"))
+
+    assert session.urls == ["https://first", "https://second"]
+
+
+def test_empty_pool_is_unavailable():
+    pool = WebhookPool(["", ""])
+
+    with pytest.raises(WebhookUnavailable):
+        asyncio.run(pool.acquire())
+
+
+def test_exhausted_bucket_waits_for_reset():
+    now = time.monotonic()
+    bucket = WebhookBucket("https://hook")
+    bucket.update({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "1"}, now)
+
+    assert not bucket.is_ready(now)
+    assert bucket.is_ready(now + 1)
+
+    bucket.in_flight = 1
+    assert not bucket.is_ready(now + 1)
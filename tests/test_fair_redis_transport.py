@@ -0,0 +1,76 @@
+import asyncio
+import datetime
+
+import pytest
+from redis.client import Redis
+
+from models.message import Message, MessangerEnum
+from settings import TransportSettings
+from transports.fair_redis_transport import FairRedisTransport
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+@pytest.fixture
+def transport(monkeypatch) -> FairRedisTransport:
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        Redis, "from_url", lambda url, **kwargs: fakeredis.FakeRedis(server=server)
+    )
+    return FairRedisTransport(TransportSettings(dsn="redis://", queue="left"))
+
+
+def create_message(chat_id: str, message_id: str) -> Message:
+    return Message(
+        message_id=message_id,
+        message="hello",
+        chat_id=chat_id,
+        user_id="1",
+        username="user",
+        timestamp=datetime.datetime.now(datetime.UTC),
+        messanger=MessangerEnum.telegram,
+    )
+
+
+def send_all(transport: FairRedisTransport, messages: list[Message]) -> None:
+    async def run() -> None:
+        for message in messages:
+            await transport.send(message)
+
+    asyncio.run(run())
+
+
+def receive(transport: FairRedisTransport, count: int) -> list[Message]:
+    messages = transport.messages()
+    return [next(messages) for _ in range(count)]
+
+
+def test_light_chat_is_not_starved_by_heavy_chat(transport):
+    send_all(transport, [create_message("heavy", str(index)) for index in range(50)])
+    send_all(transport, [create_message("light", str(index)) for index in range(3)])
+
+    received = receive(transport, 53)
+    light = [index for index, item in enumerate(received) if item.chat_id == "light"]
+
+    assert len(light) == 3
+    assert light[-1] < 2 * transport.settings.quantum + 3
+    assert transport.size() == 0
+
+
+def test_messages_of_a_chat_keep_their_order(transport):
+    send_all(
+        transport,
+        [
+            create_message(chat_id, str(index))
+            for index in range(10)
+            for chat_id in ("first", "second")
+        ],
+    )
+
+    received = receive(transport, 20)
+
+    for chat_id in ("first", "second"):
+        assert [
+            message.message_id for message in received if message.chat_id == chat_id
+        ] == [str(index) for index in range(10)]
@@ -0,0 +1,82 @@
+import datetime
+
+from bridges.load_shedder import LoadShedder
+from models.message import Message, MessageFile, MessangerEnum
+from settings import SheddingSettings, TransportSettings
+from transports.memory_transport import InMemoryTransport
+
+
+class Backlog(InMemoryTransport):
+
+    def __init__(self, backlog: int) -> None:
+        super().__init__(TransportSettings(dsn="", queue="left"))
+        self.backlog = backlog
+
+    def size(self) -> int:
+        return self.backlog
+
+
+def create_message(
+    text: str = "hello",
+    age: float = 0.0,
+    images: list[MessageFile] | None = None,
+) -> Message:
+    return Message(
+        message_id="1",
+        message=text,
+        chat_id="100",
+        user_id="1",
+        username="user",
+        timestamp=datetime.datetime.now(datetime.UTC) - datetime.timedelta(seconds=age),
+        messanger=MessangerEnum.discord,
+        images=images or [],
+    )
+
+
+def image() -> MessageFile:
+    return MessageFile(name="image.png", url="https://cdn/image.png")
+
+
+def create_shedder(backlog: int = 0, **settings) -> LoadShedder:
+    return LoadShedder(
+        settings=SheddingSettings(check_interval=0, **settings),
+        transport=Backlog(backlog),
+    )
+
+
+def test_stale_messages_are_shed():
+    shedder = create_shedder(message_ttl=60)
+
+    assert shedder.shed(create_message(text="", age=120, images=[image()])) is None
+
+    summarized = shedder.shed(create_message(age=120, images=[image()]))
+    assert summarized.images == []
+    assert summarized.message == "hello\n[1 attachment(s) omitted]"
+
+    assert shedder.shed(create_message(age=120)).message == "hello"
+
+
+def test_fresh_messages_pass_below_watermark():
+    shedder = create_shedder(backlog=10, high_watermark=100, message_ttl=60)
+    message = create_message(age=1, images=[image()])
+
+    assert shedder.shed(message) == message
+    assert not shedder.degraded
+
+
+def test_backlog_degrades_until_low_watermark():
+    shedder = create_shedder(backlog=150, high_watermark=100, low_watermark=20)
+    message = create_message(images=[image()])
+
+    linked = shedder.shed(message)
+    assert shedder.degraded
+    assert linked.images == []
+    assert linked.message == "hello\nhttps://cdn/image.png"
+
+    shedder.transport.backlog = 50
+    assert shedder.shed(message) == linked
+    assert shedder.degraded
+
+    shedder.transport.backlog = 20
+    assert shedder.shed(message) == message
+    assert not shedder.degraded
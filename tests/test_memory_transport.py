@@ -0,0 +1,122 @@
+import asyncio
+import datetime
+import itertools
+
+import pydantic
+import pytest
+
+from models.message import Message, MessangerEnum
+from settings import BridgeSettings, TransportSettings
+from transports.memory_transport import InMemoryTransport
+
+
+def create_message(message_id: str) -> Message:
+    return Message(
+        message_id=message_id,
+        message="hello",
+        chat_id="100",
+        user_id="1",
+        username="user",
+        timestamp=datetime.datetime.now(datetime.timezone.utc),
+        messanger=MessangerEnum.telegram,
+    )
+
+
+def send_all(transport: InMemoryTransport, count: int) -> None:
+    async def run() -> None:
+        for index in range(count):
+            await transport.send(create_message(str(index)))
+
+    asyncio.run(run())
+
+
+def receive(transport: InMemoryTransport, count: int) -> list[str]:
+    messages = itertools.islice(transport.messages(), count)
+    return [message.message_id for message in messages]
+
+
+def test_messages_are_fifo():
+    transport = InMemoryTransport(TransportSettings(dsn="", queue="left"))
+
+    send_all(transport, 5)
+
+    assert transport.size() == 5
+    assert receive(transport, 5) == ["0", "1", "2", "3", "4"]
+    assert transport.size() == 0
+
+
+def test_overflow_spills_in_order(tmp_path):
+    transport = InMemoryTransport(
+        TransportSettings(dsn=str(tmp_path), queue="left", maxsize=2)
+    )
+
+    send_all(transport, 5)
+
+    assert transport.size() == 5
+    assert transport.spilled == 3
+    assert receive(transport, 5) == ["0", "1", "2", "3", "4"]
+
+
+def test_spill_survives_restart(tmp_path):
+    settings = TransportSettings(dsn=str(tmp_path), queue="left", maxsize=1)
+    send_all(InMemoryTransport(settings), 3)
+
+    transport = InMemoryTransport(settings)
+
+    assert transport.size() == 2
+    assert receive(transport, 2) == ["1", "2"]
+
+
+def bridge_settings(**kwargs) -> BridgeSettings:
+    return BridgeSettings(
+        name="bridge",
+        storage_dsn="bridge.json",
+        storage_chat_id="1",
+        transport_left_queue="left",
+        transport_right_queue="right",
+        messanger_left_token="token",
+        messanger_right_token="token",
+        **kwargs,
+    )
+
+
+def test_memory_backend_needs_no_dsn():
+    assert bridge_settings(transport_backend="memory").transport_dsn == ""
+
+
+@pytest.mark.parametrize("backend", ["redis", "fair_redis"])
+def test_redis_backends_need_dsn(backend: str):
+    with pytest.raises(pydantic.ValidationError, match="transport_dsn"):
+        bridge_settings(transport_backend=backend)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(pydantic.ValidationError):
+        bridge_settings(transport_backend="kafka", transport_dsn="redis://")
+
+
+def test_close_drains_queued_messages():
+    transport = InMemoryTransport(TransportSettings(dsn="", queue="left"))
+    send_all(transport, 5)
+    messages = transport.messages()
+    first = next(messages)
+
+    transport.close()
+
+    assert [first.message_id, *(message.message_id for message in messages)] == [
+        "0",
+        "1",
+        "2",
+        "3",
+        "4",
+    ]
+
+
+def test_send_after_close_is_spilled(tmp_path):
+    settings = TransportSettings(dsn=str(tmp_path), queue="left")
+    transport = InMemoryTransport(settings)
+    transport.close()
+
+    send_all(transport, 2)
+
+    assert InMemoryTransport(settings).size() == 2
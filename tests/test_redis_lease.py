@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+from redis.client import Redis
+
+from leases.redis_lease import RedisLease
+from settings import LeaseSettings
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        Redis, "from_url", lambda url, **kwargs: fakeredis.FakeRedis(server=server)
+    )
+    return server
+
+
+def create_lease(ttl: float = 15.0, heartbeat: float = 5.0) -> RedisLease:
+    return RedisLease(
+        LeaseSettings(dsn="redis://", key="bridge:lease", ttl=ttl, heartbeat=heartbeat)
+    )
+
+
+def test_acquire_is_exclusive(server):
+    first, second = create_lease(), create_lease()
+
+    assert first.try_acquire()
+    assert first.is_held()
+    assert not second.try_acquire()
+    assert not second.is_held()
+
+    first.release()
+    assert not first.is_held()
+    assert second.try_acquire()
+    assert second.fence == first.fence + 1
+
+
+def test_acquire_stops_waiting_when_stopped(server):
+    first, second = create_lease(), create_lease(heartbeat=0.01)
+    stopped = threading.Event()
+    first.try_acquire()
+    threading.Timer(0.05, stopped.set).start()
+
+    assert not second.acquire(stopped)
+
+
+def test_renew_extends_only_own_lease(server):
+    lease = create_lease()
+    lease.try_acquire()
+    lease.valid_until = 0.0
+
+    assert lease.renew()
+    assert lease.is_held()
+
+    lease.redis.set(lease.settings.key, "other")
+    assert not lease.renew()
+    assert not lease.is_held()
+
+
+def test_fenced_rejects_stale_fence(server):
+    first, second = create_lease(), create_lease()
+    first.try_acquire()
+
+    assert first.fenced(lambda pipeline: pipeline.set("written", "first"))
+
+    first.redis.delete(first.settings.key)
+    second.try_acquire()
+
+    assert not first.fenced(lambda pipeline: pipeline.set("written", "stale"))
+    assert not first.is_held()
+    assert second.fenced(lambda pipeline: pipeline.set("written", "second"))
+    assert second.redis.get("written") == b"second"
+
+
+def test_keep_alive_exits_when_lease_is_lost(server, monkeypatch):
+    class Exited(Exception):
+        pass
+
+    def exit(code: int) -> None:
+        raise Exited(code)
+
+    monkeypatch.setattr("leases.redis_lease.os._exit", exit)
+    lease = create_lease(heartbeat=0.01)
+    lease.try_acquire()
+    lease.redis.delete(lease.settings.key)
+
+    with pytest.raises(Exited):
+        lease.keep_alive(threading.Event())
@@ -0,0 +1,33 @@
+import pytest
+from redis.client import Redis
+
+from settings import StorageSettings
+from storages.redis_storage import RedisStorage
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        Redis, "from_url", lambda url, **kwargs: fakeredis.FakeRedis(server=server)
+    )
+    return server
+
+
+def create_storage() -> RedisStorage:
+    return RedisStorage(StorageSettings(dsn="redis://", chat_id="200", prefix="test"))
+
+
+def test_destination_states_are_shared_between_replicas(server):
+    first, second = create_storage(), create_storage()
+
+    first.set_destination_state(destination="100", state="open")
+    second.set_destination_state(destination="101", state="closed")
+    first.set_destination_state(destination="101", state="half_open")
+
+    assert second.list_of_destination_states() == {
+        "100": "open",
+        "101": "half_open",
+    }
@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+import threading
+import time
+
+import pytest
+from redis.client import Redis
+
+from models.message import Message, MessangerEnum
+from settings import TransportSettings
+from transports.redis_transport import RedisTransport
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        Redis, "from_url", lambda url, **kwargs: fakeredis.FakeRedis(server=server)
+    )
+    return server
+
+
+def create_message(message_id: str) -> Message:
+    return Message(
+        message_id=message_id,
+        message="hello",
+        chat_id="100",
+        user_id="1",
+        username="user",
+        timestamp=datetime.datetime.now(datetime.UTC),
+        messanger=MessangerEnum.telegram,
+    )
+
+
+def test_messages_are_consumed_in_order(server):
+    transport = RedisTransport(TransportSettings(dsn="redis://", queue="left"))
+    for message_id in ("1", "2", "3"):
+        asyncio.run(transport.send(create_message(message_id)))
+
+    messages = transport.messages()
+
+    assert [next(messages).message_id for _ in range(3)] == ["1", "2", "3"]
+    assert transport.size() == 0
+
+
+def test_close_wakes_blocked_consumer(server):
+    transport = RedisTransport(TransportSettings(dsn="redis://", queue="left"))
+    received = []
+    consumer = threading.Thread(target=lambda: received.extend(transport.messages()))
+    consumer.start()
+    time.sleep(0.1)
+
+    started_at = time.monotonic()
+    transport.close()
+    consumer.join(timeout=5)
+
+    assert not consumer.is_alive()
+    assert time.monotonic() - started_at < 5
+    assert received == []
@@ -0,0 +1,50 @@
+import datetime
+
+import pytest
+
+from archives import segment_archive
+from archives.segment_archive import SegmentArchive
+from models.message import Message, MessangerEnum
+from settings import ArchiveSettings
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+DAY = datetime.timedelta(days=1)
+
+
+def create_message(message_id: str) -> Message:
+    return Message(
+        message_id=message_id,
+        message="hello",
+        chat_id="100",
+        user_id="1",
+        username="user",
+        timestamp=NOW,
+        messanger=MessangerEnum.telegram,
+    )
+
+
+def test_writer_starts_on_first_append(tmp_path):
+    archive = SegmentArchive(ArchiveSettings(dsn=str(tmp_path)))
+    assert archive.writer is None
+
+    archive.append(create_message("1"))
+    archive.append(create_message("2"))
+    archive.close()
+
+    messages = archive.read(NOW - DAY, NOW + DAY)
+    assert [message.message_id for message in messages] == ["1", "2"]
+
+
+def test_reader_does_not_start_writer(tmp_path):
+    archive = SegmentArchive(ArchiveSettings(dsn=str(tmp_path)))
+
+    assert list(archive.read(NOW - DAY, NOW + DAY)) == []
+    assert archive.writer is None
+
+
+def test_zstandard_segment_without_zstandard(tmp_path, monkeypatch):
+    (tmp_path / "1.jsonl.zst").write_bytes(b"")
+    monkeypatch.setattr(segment_archive, "zstandard", None)
+
+    with pytest.raises(RuntimeError, match="zstandard is required"):
+        segment_archive.open_segment(tmp_path / "1.jsonl.zst")
@@ -0,0 +1,74 @@
+import random
+import time
+
+import pytest
+
+from messangers.splitter import split_text, utf16_length
+
+ALPHABET = "ab cd\n\n  éж中文😀🇺🇦👍🏽"
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choices(ALPHABET, k=length))
+
+
+def squeeze(text: str) -> str:
+    return "".join(text.split())
+
+
+def check_parts(text: str, parts: list[str], limit: int, utf16: bool) -> None:
+    position = 0
+    for part in parts:
+        assert part.strip()
+        assert len(part) <= limit
+        if utf16:
+            assert utf16_length(part) <= limit
+        assert not any("\ud800" <= char <= "\udfff" for char in part)
+
+        position = text.index(part, position) + len(part)
+
+    assert squeeze("".join(parts)) == squeeze(text)
+
+
+@pytest.mark.parametrize("utf16", [False, True])
+@pytest.mark.parametrize("seed", range(200))
+def test_split_text_fuzz(seed: int, utf16: bool):
+    rng = random.Random(seed)
+    text = random_text(rng, rng.randint(0, 400))
+    limit = rng.randint(2, 64)
+
+    check_parts(text, list(split_text(text, limit, utf16=utf16)), limit, utf16)
+
+
+def test_split_text_prefers_newlines():
+    text = "first line\nsecond line"
+
+    assert list(split_text(text, 16)) == ["first line", "second line"]
+
+
+def test_split_text_skips_blank_parts():
+    text = "word" + "\n" * 20 + "word"
+
+    assert list(split_text(text, 4)) == ["word", "word"]
+
+
+def test_split_text_keeps_surrogate_pairs():
+    text = "😀" * 5
+
+    assert list(split_text(text, 3, utf16=True)) == ["😀"] * 5
+
+
+def test_split_text_rejects_limit_below_astral_character():
+    with pytest.raises(ValueError):
+        list(split_text("a😀b", 1, utf16=True))
+
+
+def test_split_text_multi_megabyte():
+    text = random_text(random.Random(0), 4 * 1024 * 1024)
+
+    started_at = time.perf_counter()
+    parts = list(split_text(text, 4096, utf16=True))
+    elapsed = time.perf_counter() - started_at
+
+    check_parts(text, parts, 4096, True)
+    assert elapsed < 10
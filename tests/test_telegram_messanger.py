@@ -0,0 +1,131 @@
+import asyncio
+import datetime
+import types
+
+import pytest
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut
+
+from messangers.circuit_breaker import CircuitState
+from messangers.telegram_messanger import TelegramMessanger
+from models.message import Message, MessageFile, MessangerEnum
+from settings import MessangerSettings, StorageSettings, TransportSettings
+from storages.static_storage import StaticStorage
+from storages.threaded_storage import ThreadedStorage
+from transports.memory_transport import InMemoryTransport
+
+
+def create_message() -> Message:
+    return Message(
+        message_id="1",
+        message="hello",
+        chat_id="200",
+        user_id="1",
+        username="user",
+        timestamp=datetime.datetime.now(datetime.timezone.utc),
+        messanger=MessangerEnum.discord,
+    )
+
+
+@pytest.mark.parametrize(
+    "error, state, connected",
+    [
+        (BadRequest("Message caption is too long"), CircuitState.closed, True),
+        (
+            Forbidden("Forbidden: bot was blocked by the user"),
+            CircuitState.closed,
+            False,
+        ),
+        (RetryAfter(30), CircuitState.closed, True),
+        (TimedOut(), CircuitState.open, True),
+    ],
+)
+def test_send_errors_update_breaker(
+    tmp_path, error: Exception, state: CircuitState, connected: bool
+):
+    storage = StaticStorage(
+        StorageSettings(dsn=str(tmp_path / "bridge.json"), chat_id="200")
+    )
+    storage.connect("100")
+    messanger = TelegramMessanger(
+        settings=MessangerSettings(token="1:token", breaker_threshold=1),
+        transport=InMemoryTransport(TransportSettings(dsn="", queue="right")),
+        storage=ThreadedStorage(storage=storage),
+    )
+
+    async def send_to_channel(*args) -> None:
+        raise error
+
+    messanger.send_to_channel = send_to_channel
+
+    async def run() -> None:
+        await messanger.send_message(create_message())
+        await asyncio.gather(*messanger.background_tasks)
+
+    asyncio.run(run())
+
+    assert messanger.breakers.get("100").state == state
+    assert (storage.get_recipients("200") == ["100"]) == connected
+
+
+def test_prepare_images_probes_only_unknown_sizes(tmp_path, monkeypatch):
+    probed = []
+
+    async def probe_image(session, url: str) -> None:
+        probed.append(url)
+        return None
+
+    monkeypatch.setattr("messangers.telegram_messanger.probe_image", probe_image)
+    messanger = TelegramMessanger(
+        settings=MessangerSettings(token="1:token"),
+        transport=InMemoryTransport(TransportSettings(dsn="", queue="right")),
+        storage=ThreadedStorage(
+            storage=StaticStorage(
+                StorageSettings(dsn=str(tmp_path / "bridge.json"), chat_id="200")
+            )
+        ),
+    )
+    images = [
+        MessageFile(name="known.png", url="https://known", width=640, height=480),
+        MessageFile(name="unknown.png", url="https://unknown"),
+    ]
+
+    assert asyncio.run(messanger.prepare_images(images)) == {}
+    assert probed == ["https://unknown"]
+
+
+def test_media_group_is_bridged_as_one_message(tmp_path):
+    storage = StaticStorage(
+        StorageSettings(dsn=str(tmp_path / "bridge.json"), chat_id="200")
+    )
+    storage.connect("100")
+    transport = InMemoryTransport(TransportSettings(dsn="", queue="left"))
+    messanger = TelegramMessanger(
+        settings=MessangerSettings(token="1:token", media_group_linger=0.01),
+        transport=transport,
+        storage=ThreadedStorage(storage=storage),
+    )
+    update = types.SimpleNamespace(message=types.SimpleNamespace(media_group_id="g"))
+    parts = [
+        create_message().model_copy(
+            update={
+                "message_id": str(index),
+                "chat_id": "100",
+                "message": text,
+                "messanger": MessangerEnum.telegram,
+                "images": [MessageFile(name=f"{index}.jpg", file_id=str(index))],
+            }
+        )
+        for index, text in enumerate(["caption", "", ""])
+    ]
+
+    async def run() -> None:
+        for part in parts:
+            await messanger.dispatch_message(update, part)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+
+    assert transport.size() == 1
+    message = transport.queue.get_nowait()
+    assert message.message == "caption"
+    assert [image.file_id for image in message.images] == ["0", "1", "2"]
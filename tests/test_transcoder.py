@@ -0,0 +1,60 @@
+import urllib.parse
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from messangers.transcoder import discord_cdn_variant, fit_image
+
+URL = "https://cdn.discordapp.com/attachments/1/2/image.png?ex=1"
+MiB = 1024 * 1024
+
+
+def variant_query(url: str) -> dict[str, str]:
+    parts = urllib.parse.urlsplit(url)
+    assert parts.hostname == "media.discordapp.net"
+    return dict(urllib.parse.parse_qsl(parts.query))
+
+
+def test_small_image_keeps_original_url():
+    assert discord_cdn_variant(URL, 1000, 500, 2 * MiB, 2560, 5 * MiB) == URL
+
+
+@pytest.mark.parametrize("size", [None, 0])
+def test_unknown_size_keeps_original_url(size: int | None):
+    assert discord_cdn_variant(URL, 1000, 500, size, 2560, 5 * MiB) == URL
+
+
+@pytest.mark.parametrize("size", [None, 0])
+def test_unknown_size_and_dimensions_keep_original_url(size: int | None):
+    assert discord_cdn_variant(URL, None, None, size, 2560, 5 * MiB) == URL
+    assert discord_cdn_variant(URL, 0, 0, size, 2560, 5 * MiB) == URL
+
+
+def test_large_dimensions_are_scaled_to_jpeg():
+    query = variant_query(discord_cdn_variant(URL, 5120, 2560, None, 2560, 5 * MiB))
+
+    assert query == {"ex": "1", "width": "2560", "height": "1280", "format": "jpeg"}
+
+
+def test_heavy_image_is_reencoded_at_full_size():
+    query = variant_query(discord_cdn_variant(URL, 2560, 1440, 9 * MiB, 2560, 5 * MiB))
+
+    assert query["format"] == "jpeg"
+    assert (query["width"], query["height"]) == ("2560", "1440")
+
+
+def test_foreign_urls_are_untouched():
+    url = "https://example.com/image.png"
+
+    assert discord_cdn_variant(url, 5120, 2560, 9 * MiB, 2560, 5 * MiB) == url
+
+
+def test_fit_image_shrinks_to_limit():
+    buffer = BytesIO()
+    Image.effect_noise((2048, 2048), 64).convert("RGB").save(buffer, format="PNG")
+
+    name, data = fit_image(buffer.getvalue(), "noise.png", 512 * 1024)
+
+    assert name == "noise.jpg"
+    assert len(data) <= 512 * 1024
@@ -0,0 +1,86 @@
+import pytest
+from redis.client import Redis
+
+from settings import StorageSettings
+from storages.abstract_storage import AbstractStorage
+from storages.redis_storage import RedisStorage
+from storages.static_storage import StaticStorage
+from storages.user_index import UserIndex
+
+
+@pytest.fixture(params=["static", "redis"])
+def storage(request, tmp_path, monkeypatch) -> AbstractStorage:
+    if request.param == "static":
+        return StaticStorage(
+            StorageSettings(dsn=str(tmp_path / "bridge.json"), chat_id="200")
+        )
+
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        Redis, "from_url", lambda url, **kwargs: fakeredis.FakeRedis(server=server)
+    )
+    return RedisStorage(StorageSettings(dsn="redis://", chat_id="200", prefix="test"))
+
+
+def nicknames(page: tuple[list, int]) -> tuple[list[str], int]:
+    users, total = page
+    return [user.nickname for user in users], total
+
+
+def test_user_index_pages_by_casefolded_prefix():
+    index = UserIndex()
+    for chat_id, nickname in [("1", "bob"), ("2", "Alice"), ("3", "alex"), ("4", "b")]:
+        index.add(chat_id, nickname)
+
+    assert nicknames(index.page(0, 10)) == (["alex", "Alice", "b", "bob"], 4)
+    assert nicknames(index.page(0, 10, prefix="AL")) == (["alex", "Alice"], 2)
+    assert nicknames(index.page(1, 1, prefix="al")) == (["Alice"], 2)
+    assert nicknames(index.page(0, 10, prefix="c")) == ([], 0)
+
+
+def test_user_index_update_and_removal():
+    index = UserIndex()
+    index.add("1", "bob")
+    index.add("2", "alice")
+    index.add("1", "zed")
+    index.remove("2")
+    index.remove("missing")
+
+    assert "2" not in index
+    assert nicknames(index.page(0, 10)) == (["zed"], 1)
+
+
+def test_storage_pages_connected_users(storage):
+    for chat_id, nickname in [("1", "bob"), ("2", "Alice"), ("3", "alex")]:
+        storage.set_nickname(chat_id, nickname)
+        storage.connect(chat_id)
+
+    assert nicknames(storage.page_of_users(0, 10)) == (["alex", "Alice", "bob"], 3)
+    assert nicknames(storage.page_of_users(0, 1, prefix="al")) == (["alex"], 2)
+    assert nicknames(storage.page_of_nicknames(0, 10, prefix="b")) == (["bob"], 1)
+
+
+def test_storage_index_follows_nickname_changes(storage):
+    storage.set_nickname("1", "bob")
+    storage.connect("1")
+    storage.set_nickname("1", "carol")
+
+    assert nicknames(storage.page_of_users(0, 10, prefix="b")) == ([], 0)
+    assert nicknames(storage.page_of_users(0, 10, prefix="c")) == (["carol"], 1)
+
+
+def test_storage_index_drops_disconnected_and_approved_users(storage):
+    storage.set_nickname("1", "bob")
+    storage.set_nickname("2", "alice")
+    storage.connect("1")
+    storage.moderate("2")
+
+    assert nicknames(storage.page_of_moderation(0, 10)) == (["alice"], 1)
+
+    storage.disconnect("1")
+    storage.approve("2")
+
+    assert nicknames(storage.page_of_users(0, 10)) == (["alice"], 1)
+    assert nicknames(storage.page_of_moderation(0, 10)) == ([], 0)
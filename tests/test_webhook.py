@@ -0,0 +1,141 @@
+import asyncio
+import types
+
+import pydantic
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from messangers.telegram_messanger import TelegramMessanger
+from receivers.webhook_receiver import SECRET_HEADER, WebhookReceiver, WebhookRoute
+from settings import (
+    BridgeSettings,
+    MessangerSettings,
+    StorageSettings,
+    TransportSettings,
+    WebhookSettings,
+)
+from storages.static_storage import StaticStorage
+from storages.threaded_storage import ThreadedStorage
+from transports.memory_transport import InMemoryTransport
+
+
+class Stopped(Exception):
+    pass
+
+
+class Bot:
+
+    def __init__(self) -> None:
+        self.webhook: dict = {}
+
+    async def set_webhook(self, **kwargs) -> None:
+        self.webhook = kwargs
+
+
+class Updates:
+
+    async def blpop(self, keys: list[str], timeout: int) -> None:
+        raise Stopped()
+
+
+def create_bridge_settings(**settings) -> BridgeSettings:
+    return BridgeSettings(
+        name="bridge",
+        storage_dsn="bridge.json",
+        storage_chat_id="200",
+        transport_backend="memory",
+        transport_left_queue="left",
+        transport_right_queue="right",
+        messanger_left_token="1:token",
+        messanger_right_token="token",
+        **settings,
+    )
+
+
+def test_receiver_routes_updates_by_token_and_secret():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeAsyncRedis()
+    receiver = WebhookReceiver(
+        settings=WebhookSettings(),
+        routes=[
+            WebhookRoute(
+                token="1:token", secret="secret", dsn="redis://", queue="updates"
+            )
+        ],
+    )
+    receiver.clients["redis://"] = redis
+
+    app = web.Application()
+    app.router.add_post("/{token}", receiver.handle_update)
+
+    async def run() -> tuple[list[int], list[bytes]]:
+        async with TestClient(TestServer(app)) as client:
+            statuses = []
+            for path, secret in [
+                ("/1:token", "secret"),
+                ("/1:token", "wrong"),
+                ("/2:token", "secret"),
+            ]:
+                response = await client.post(
+                    path, data=b'{"update_id": 1}', headers={SECRET_HEADER: secret}
+                )
+                statuses.append(response.status)
+        return statuses, await redis.lrange("updates", 0, -1)
+
+    assert asyncio.run(run()) == ([200, 403, 404], [b'{"update_id": 1}'])
+
+
+def test_webhook_is_registered_under_the_bot_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "messangers.telegram_messanger.Redis.from_url", lambda url: Updates()
+    )
+    messanger = TelegramMessanger(
+        settings=MessangerSettings(
+            token="1:token",
+            webhook_url="https://hook.example/",
+            webhook_secret="secret",
+            webhook_dsn="redis://",
+            webhook_queue="updates",
+        ),
+        transport=InMemoryTransport(TransportSettings(dsn="", queue="left")),
+        storage=ThreadedStorage(
+            storage=StaticStorage(
+                StorageSettings(dsn=str(tmp_path / "bridge.json"), chat_id="200")
+            )
+        ),
+    )
+    application = types.SimpleNamespace(bot=Bot())
+
+    with pytest.raises(Stopped):
+        asyncio.run(messanger.receive_updates(application))
+
+    assert application.bot.webhook["url"] == "https://hook.example/1:token"
+    assert application.bot.webhook["secret_token"] == "secret"
+
+
+def test_messanger_settings_ignore_environment(monkeypatch):
+    monkeypatch.setenv("TOKEN", "env:token")
+    monkeypatch.setenv("WEBHOOK_URL", "https://env.example")
+
+    settings = MessangerSettings(token="1:token")
+
+    assert settings.token == "1:token"
+    assert settings.webhook_url == ""
+
+
+def test_webhook_requires_secret_and_transport_dsn():
+    with pytest.raises(pydantic.ValidationError, match="webhook_secret"):
+        create_bridge_settings(messanger_left_webhook=True)
+
+    with pytest.raises(pydantic.ValidationError, match="transport_dsn"):
+        create_bridge_settings(
+            messanger_left_webhook=True, messanger_left_webhook_secret="secret"
+        )
+
+    settings = create_bridge_settings(
+        messanger_left_webhook=True,
+        messanger_left_webhook_secret="secret",
+        transport_dsn="redis://",
+    )
+    assert settings.messanger_left_webhook
@@ -0,0 +1,109 @@
+import asyncio
+import datetime
+import random
+
+from bridges.worker_pool import WorkerPool
+from models.message import Message, MessangerEnum
+from settings import WorkerPoolSettings
+
+
+def create_message(chat_id: str, message_id: str) -> Message:
+    return Message(
+        message_id=message_id,
+        message="hello",
+        chat_id=chat_id,
+        user_id="1",
+        username="user",
+        timestamp=datetime.datetime.now(datetime.UTC),
+        messanger=MessangerEnum.telegram,
+    )
+
+
+def interleaved(chats: int, per_chat: int) -> list[Message]:
+    return [
+        create_message(str(chat), str(index))
+        for index in range(per_chat)
+        for chat in range(chats)
+    ]
+
+
+def delivered_by_chat(delivered: list[Message]) -> dict[str, list[str]]:
+    chats: dict[str, list[str]] = {}
+    for message in delivered:
+        chats.setdefault(message.chat_id, []).append(message.message_id)
+    return chats
+
+
+def test_messages_of_a_chat_are_delivered_in_order():
+    rng = random.Random(0)
+    delivered: list[Message] = []
+
+    async def process(message: Message) -> None:
+        await asyncio.sleep(rng.uniform(0, 0.005))
+        delivered.append(message)
+
+    pool = WorkerPool(
+        settings=WorkerPoolSettings(min_workers=4, max_workers=4),
+        name="test",
+        process=process,
+    )
+    asyncio.run(pool.run(iter(interleaved(chats=3, per_chat=20))))
+
+    expected = [str(index) for index in range(20)]
+    assert delivered_by_chat(delivered) == {
+        "0": expected,
+        "1": expected,
+        "2": expected,
+    }
+
+
+def test_chats_are_delivered_in_parallel():
+    active = 0
+    peak = 0
+
+    async def process(message: Message) -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+
+    pool = WorkerPool(
+        settings=WorkerPoolSettings(min_workers=4, max_workers=4),
+        name="test",
+        process=process,
+    )
+    asyncio.run(pool.run(iter(interleaved(chats=4, per_chat=2))))
+
+    assert peak == 4
+
+
+def test_scale_down_keeps_pending_work():
+    delivered: list[Message] = []
+
+    async def process(message: Message) -> None:
+        await asyncio.sleep(0.01)
+        delivered.append(message)
+
+    async def run() -> int:
+        pool = WorkerPool(
+            settings=WorkerPoolSettings(min_workers=1, max_workers=4),
+            name="test",
+            process=process,
+        )
+        pool.resize(4)
+        for message in interleaved(chats=4, per_chat=10):
+            pool.submit(message)
+
+        await asyncio.sleep(0.02)
+        pool.resize(1)
+        await pool.drained.wait()
+        await asyncio.sleep(0.01)
+        assert not pool.lanes and not pool.pending
+        return len(pool.workers)
+
+    workers = asyncio.run(run())
+
+    expected = [str(index) for index in range(10)]
+    assert delivered_by_chat(delivered) == {str(chat): expected for chat in range(4)}
+    assert workers == 1